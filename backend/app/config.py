@@ -7,11 +7,50 @@ load_dotenv()
 class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-4o-mini"
     OPENAI_API_KEY: str = ""
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
     DATABASE_URL: str = "sqlite+aiosqlite:///./resumexpert.db"
     ADMIN_PASSWORD: str = os.environ.get("ADMIN_PASSWORD", "changeme")
     UPLOAD_DIR: str = "./uploads"
     PDF_DIR: str = "./generated"
     AI_ENABLED: bool = True
+    RENDER_CACHE_SIZE: int = 256
+
+    # Budgets enforced when an admin uploads a template
+    TEMPLATE_MAX_SOURCE_BYTES: int = 512_000
+    TEMPLATE_MAX_INLINE_IMAGE_BYTES: int = 200_000
+    TEMPLATE_PREVIEW_BUDGET_MS: int = 250
+    TEMPLATE_PDF_BUDGET_MS: int = 4000
+    TEMPLATE_MAX_HTML_BYTES: int = 1_000_000
+    TEMPLATE_MAX_PDF_BYTES: int = 2_000_000
+
+    # Limits applied to every render (Jinja sandbox + WeasyPrint child process)
+    RENDER_MAX_OPS: int = 200_000
+    RENDER_HTML_TIMEOUT_MS: int = 2000
+    RENDER_PREVIEW_TIMEOUT_MS: int = 500  # HTML-only renders done in the worker (/preview, compare)
+    RENDER_MAX_HTML_BYTES: int = 2_000_000
+    RENDER_CONCURRENCY: int = 0  # 0 = one PDF job per CPU
+    PDF_WALL_TIMEOUT_S: float = 30
+    PDF_CPU_LIMIT_S: int = 20
+    PDF_MEMORY_LIMIT_MB: int = 512
+    PDF_PROFILE: str = "default"  # output profile, see pdfgen.PDF_PROFILES
+    PDF_IMAGE_CACHE_MB: int = 64  # per profile; emptied between renders once exceeded
+
+    # Profile photos: variants (longest side in px) and the PDF byte budget
+    PHOTO_MAX_UPLOAD_BYTES: int = 10_000_000
+    PHOTO_MAX_PIXELS: int = 60_000_000
+    PHOTO_SIZES: dict = {"thumb": 160, "resume": 600}
+    PHOTO_PDF_VARIANT: str = "resume"
+    PHOTO_JPEG_QUALITY: int = 82
+    PHOTO_PDF_BUDGET_BYTES: int = 120_000
+
+    # Side-by-side comparison (/preview/compare): max ids per request, page size for "all"
+    COMPARE_MAX_TEMPLATES: int = 12
+
+    # Profiling (/admin/profiling): slow-request log and on-demand captures
+    PROFILE_SLOW_MS: int = 1000  # 0 = no slow log; requests are then only traced while a session is armed
+    PROFILE_SLOW_LOG_SIZE: int = 50
+    PROFILE_MAX_CAPTURES: int = 20
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5
 
     class Config:
         env_file = ".env"
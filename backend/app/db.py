@@ -1,5 +1,6 @@
 # backend/app/db.py
 import os
+from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 
@@ -9,4 +10,9 @@ from .config import settings
 async_engine = create_async_engine(settings.DATABASE_URL, future=True, echo=False)
 async_session_maker = sessionmaker(async_engine, expire_on_commit=False, class_=AsyncSession)
 
+
+def create_sync_engine():
+    """Blocking engine on the same database, for code that runs outside the event loop."""
+    return create_engine(settings.DATABASE_URL.replace("+aiosqlite", ""))
+
 Base = declarative_base()
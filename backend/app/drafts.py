@@ -0,0 +1,167 @@
+# backend/app/drafts.py
+"""
+Helpers for persisted resume drafts: JSON-patch (RFC 6902) deltas, owner
+tokens and a small LRU cache of renders keyed by draft version.
+"""
+import copy
+import secrets
+from collections import OrderedDict
+from threading import Lock
+
+
+class PatchError(ValueError):
+    """Raised when a patch operation cannot be applied to the draft."""
+
+
+# ---------------- JSON PATCH ----------------
+def _split_pointer(path: str):
+    if path == "":
+        return []
+    if not path.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer '{path}'")
+    return [p.replace("~1", "/").replace("~0", "~") for p in path[1:].split("/")]
+
+
+def _list_index(container: list, token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise PatchError(f"Invalid array index '{token}'")
+    idx = int(token)
+    limit = len(container) + (1 if allow_end else 0)
+    if idx >= limit:
+        raise PatchError(f"Array index {idx} out of range")
+    return idx
+
+
+def _parent(doc, parts):
+    """Walk to the container holding the last path segment."""
+    node = doc
+    for token in parts[:-1]:
+        if isinstance(node, dict):
+            if token not in node:
+                raise PatchError(f"Path segment '{token}' not found")
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_list_index(node, token, allow_end=False)]
+        else:
+            raise PatchError(f"Cannot descend into '{token}'")
+    return node
+
+
+def _get(doc, parts):
+    if not parts:
+        return doc
+    parent, key = _parent(doc, parts), parts[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise PatchError(f"Path '/{'/'.join(parts)}' not found")
+        return parent[key]
+    if isinstance(parent, list):
+        return parent[_list_index(parent, key, allow_end=False)]
+    raise PatchError(f"Path '/{'/'.join(parts)}' not found")
+
+
+def _add(doc, parts, value):
+    if not parts:
+        return value
+    parent, key = _parent(doc, parts), parts[-1]
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_list_index(parent, key, allow_end=True), value)
+    else:
+        raise PatchError(f"Cannot add to '/{'/'.join(parts)}'")
+    return doc
+
+
+def _remove(doc, parts):
+    if not parts:
+        raise PatchError("Cannot remove the document root")
+    parent, key = _parent(doc, parts), parts[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise PatchError(f"Path '/{'/'.join(parts)}' not found")
+        return parent.pop(key)
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, key, allow_end=False))
+    raise PatchError(f"Cannot remove '/{'/'.join(parts)}'")
+
+
+def apply_patch(doc: dict, ops: list) -> dict:
+    """
+    Apply a list of JSON-patch operations and return the new document.
+    The input is never mutated; any failing op aborts the whole patch.
+    """
+    if not isinstance(ops, list):
+        raise PatchError("Patch must be a list of operations")
+
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        if not isinstance(op, dict) or "path" not in op:
+            raise PatchError("Each operation needs 'op' and 'path'")
+        kind = op.get("op")
+        parts = _split_pointer(op["path"])
+
+        if kind == "add":
+            doc = _add(doc, parts, copy.deepcopy(op.get("value")))
+        elif kind == "remove":
+            _remove(doc, parts)
+        elif kind == "replace":
+            _get(doc, parts)  # target must exist
+            if parts:
+                _remove(doc, parts)
+            doc = _add(doc, parts, copy.deepcopy(op.get("value")))
+        elif kind in ("move", "copy"):
+            src = _split_pointer(op.get("from", ""))
+            if kind == "move" and parts[:len(src)] == src and parts != src:
+                raise PatchError("Cannot move a value into one of its children")
+            value = _remove(doc, src) if kind == "move" else copy.deepcopy(_get(doc, src))
+            doc = _add(doc, parts, value)
+        elif kind == "test":
+            if _get(doc, parts) != op.get("value"):
+                raise PatchError(f"Test failed at '{op['path']}'")
+        else:
+            raise PatchError(f"Unsupported op '{kind}'")
+
+    if not isinstance(doc, dict):
+        raise PatchError("Draft data must stay a JSON object")
+    return doc
+
+
+# ---------------- TOKENS ----------------
+def new_owner_token() -> str:
+    """Opaque session token used to scope drafts to one browser."""
+    return secrets.token_urlsafe(24)
+
+
+# ---------------- RENDER CACHE ----------------
+class RenderCache:
+    """
+    Thread-safe LRU mapping (kind, template_id, draft_id, version) to a render
+    (HTML string or PDF path). Draft versions are immutable, so entries never
+    need invalidating — they just age out.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
@@ -9,15 +9,6 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "resumexpert.db"))
 DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
-
-Base.metadata.create_all(bind=engine)
-db = SessionLocal()
-
-# Clear existing templates
-db.query(TemplateModel).delete()
-
 # ---------------------------------------
 # Template blocks (Jinja2)
 # ---------------------------------------
@@ -400,10 +391,25 @@ templates = [
     ("Elegant Blue", "Sidebar professional style", elegant_html, elegant_css),
 ]
 
-for name, desc, html, css in templates:
-    db.add(TemplateModel(name=name, description=desc, html=html, css=css))
 
-db.commit()
-db.close()
+def main():
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+
+    # Clear existing templates
+    db.query(TemplateModel).delete()
+
+    for name, desc, html, css in templates:
+        db.add(TemplateModel(name=name, description=desc, html=html, css=css))
+
+    db.commit()
+    db.close()
+
+    print("✅ Templates reloaded successfully with full conditional logic.")
+
 
-print("✅ Templates reloaded successfully with full conditional logic.")
+if __name__ == "__main__":
+    main()
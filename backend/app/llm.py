@@ -28,7 +28,7 @@ async def call_openai(prompt: str):
         for attempt in range(3):
             try:
                 response = await client.post(
-                    "https://api.openai.com/v1/chat/completions",
+                    f"{settings.OPENAI_BASE_URL.rstrip('/')}/chat/completions",
                     headers=headers,
                     json=data
                 )
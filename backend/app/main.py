@@ -1,22 +1,33 @@
 import os
 import json
-from datetime import datetime
+import time
+import uuid
+import base64
+import asyncio
+from datetime import datetime, timezone
+from html import escape
 from typing import Optional
 
-from fastapi import FastAPI, Request, HTTPException, UploadFile, File, Form, Body
-from fastapi.responses import JSONResponse, FileResponse, HTMLResponse
+from fastapi import FastAPI, Request, HTTPException, UploadFile, File, Form, Body, Header, Depends
+from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
-from jinja2 import Template as JinjaTemplate
-from sqlalchemy import select
-from weasyprint import HTML, CSS
+from sqlalchemy import select, update
 
 # ---------------- LOCAL IMPORTS ----------------
 from backend.app import schemas
+from backend.app import schema
 from backend.app import llm
-from backend.app.db import async_session_maker
-from backend.app.models import Template as TemplateModel
+from backend.app import drafts
+from backend.app import template_check
+from backend.app import render_pool
+from backend.app import warmup
+from backend.app import photos
+from backend.app import profiling
+from backend.app.pdfgen import RenderError, render_html_from_template
+from backend.app.db import async_engine, async_session_maker
+from backend.app.models import Template as TemplateModel, Resume as ResumeModel
 from backend.app.llm import call_openai
 
 # ---------------- PATH CONFIG ----------------
@@ -25,6 +36,7 @@ FRONTEND_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "frontend"))
 STATIC_DIR = os.path.join(FRONTEND_DIR, "static")
 PDF_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "generated_pdfs"))
 UPLOAD_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "uploads"))
+PHOTO_DIR = os.path.join(UPLOAD_DIR, "photos")
 
 os.makedirs(PDF_DIR, exist_ok=True)
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -51,6 +63,31 @@ else:
     print("⚠️  Warning: Static directory not found:", STATIC_DIR)
 
 
+@app.exception_handler(RenderError)
+async def render_error_handler(request: Request, exc: RenderError):
+    print(f"❌ Render refused ({exc.code}) on {request.url.path}:", exc.message)
+    return JSONResponse(status_code=exc.status_code, content={"error": exc.as_dict()})
+
+
+@app.on_event("startup")
+async def start_render_pool():
+    # First hook: the fork server must start before aiosqlite/to_thread threads exist
+    render_pool.start()
+
+
+@app.on_event("startup")
+async def create_tables():
+    async with async_engine.begin() as conn:
+        # Normally a no-op: gunicorn's master already ran schema.migrate() (deploy/gunicorn_conf.py)
+        await conn.run_sync(schema.ensure_schema)
+
+
+@app.on_event("startup")
+async def start_warmup():
+    # Runs in the background; /ready reports 503 until it finishes
+    app.state.warmup_task = asyncio.create_task(warmup.warm_all(fetch_templates_async))
+
+
 # ---------------- UTILS ----------------
 async def fetch_templates_async():
     async with async_session_maker() as session:
@@ -58,20 +95,44 @@ async def fetch_templates_async():
         return result.scalars().all()
 
 
-def render_html_from_template(html_tpl: str, css: str, data: dict) -> str:
-    """Render Jinja template and embed CSS inline."""
-    rendered = JinjaTemplate(html_tpl).render(**(data or {}))
-    return f"""
-    <!doctype html>
-    <html>
-      <head>
-        <meta charset="utf-8"/>
-        <meta name="viewport" content="width=device-width,initial-scale=1"/>
-        <style>{css or ''}</style>
-      </head>
-      <body>{rendered}</body>
-    </html>
-    """
+# Renders of immutable draft versions, shared by /preview and /generate
+render_cache = drafts.RenderCache(settings.RENDER_CACHE_SIZE)
+
+
+def int_field(body: dict, name: str, default=None):
+    """An optional integer from a JSON body; 400 when it is present but not one."""
+    value = body.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"{name} must be an integer")
+
+
+async def load_draft(draft_id: int, token: Optional[str], version: Optional[int] = None):
+    """Fetch a draft owned by `token`; 409 if the caller's version is stale."""
+    if not token:
+        raise HTTPException(status_code=401, detail="Missing X-Draft-Token header")
+    async with async_session_maker() as session:
+        draft = await session.get(ResumeModel, draft_id)
+    if not draft or draft.owner_token != token:
+        raise HTTPException(status_code=404, detail="Draft not found")
+    if version is not None and version != draft.version:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Draft version is stale", "current_version": draft.version},
+        )
+    return draft
+
+
+def draft_summary(draft):
+    return {
+        "id": draft.id,
+        "version": draft.version,
+        "template_id": draft.template_id,
+        "updated_at": draft.updated_at.isoformat() if draft.updated_at else None,
+    }
 
 
 # ---------------- ROUTES ----------------
@@ -126,13 +187,66 @@ async def get_template(tid: int):
     }
 
 
+async def gallery_entry(tid: int):
+    """
+    Pre-rendered sample output for a template, warming it on the render pool
+    on a miss. A template whose sample render already failed gets a 503.
+    """
+    entry = warmup.gallery.get(tid)
+    if entry:
+        return entry
+    error = warmup.status.templates.get(tid, {}).get("error")
+    if error is None:
+        async with async_session_maker() as session:
+            tpl = await session.get(TemplateModel, tid)
+        if not tpl:
+            raise HTTPException(status_code=404, detail="Template not found")
+        error = (await warmup.ensure_warm(tpl)).get("error")
+    if error is not None:
+        raise HTTPException(status_code=503, detail=f"Sample render failed for this template: {error}")
+    return warmup.gallery[tid]
+
+
+@app.get("/api/templates/{tid}/gallery", response_class=HTMLResponse)
+async def template_gallery(tid: int):
+    entry = await gallery_entry(tid)
+    return HTMLResponse(entry["html"], headers={"Cache-Control": "public, max-age=300"})
+
+
+@app.get("/api/templates/{tid}/thumbnail")
+async def template_thumbnail(tid: int):
+    entry = await gallery_entry(tid)
+    return Response(
+        entry["thumbnail"],
+        media_type="application/pdf",
+        headers={"Cache-Control": "public, max-age=300"},
+    )
+
+
 # ---------------- PREVIEW ----------------
 @app.post("/preview", response_class=HTMLResponse)
-async def preview(template_id: int = Form(...), data_json: str = Form(...)):
-    try:
-        data = json.loads(data_json or "{}")
-    except Exception:
-        data = {}
+@profiling.traced("preview")
+async def preview(
+    template_id: int = Form(...),
+    data_json: str = Form(""),
+    draft_id: Optional[int] = Form(None),
+    version: Optional[int] = Form(None),
+    x_draft_token: Optional[str] = Header(None),
+):
+    cache_key = None
+    if draft_id is not None:
+        draft = await load_draft(draft_id, x_draft_token, version)
+        cache_key = ("html", template_id, draft.id, draft.version)
+        cached = render_cache.get(cache_key)
+        if cached is not None:
+            return HTMLResponse(content=cached)
+        data = draft.data or {}
+    else:
+        try:
+            data = json.loads(data_json or "{}")
+        except Exception:
+            data = {}
+    profiling.annotate(template_id, data)
 
     async with async_session_maker() as session:
         result = await session.execute(select(TemplateModel).where(TemplateModel.id == template_id))
@@ -141,58 +255,322 @@ async def preview(template_id: int = Form(...), data_json: str = Form(...)):
     if not tpl:
         raise HTTPException(status_code=404, detail="Template not found")
 
-    html = render_html_from_template(tpl.html, tpl.css, data)
+    data = photos.with_photo_url(data, PHOTO_DIR)
+    # Off the event loop, under the tighter in-worker budget
+    html = await asyncio.to_thread(
+        render_html_from_template, tpl.html, tpl.css, data, settings.RENDER_PREVIEW_TIMEOUT_MS
+    )
+    if cache_key:
+        render_cache.put(cache_key, html)
     return HTMLResponse(content=html)
 
 
+# ---------------- COMPARE ----------------
+def multipart_response(parts):
+    """Build a multipart/mixed response from (name, content_type, bytes) parts."""
+    boundary = uuid.uuid4().hex
+    chunks = []
+    for name, content_type, payload in parts:
+        chunks.append(
+            f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Disposition: inline; name=\"{name}\"\r\nContent-Length: {len(payload)}\r\n\r\n".encode()
+        )
+        chunks.extend([payload, b"\r\n"])
+    chunks.append(f"--{boundary}--\r\n".encode())
+    return Response(b"".join(chunks), media_type=f"multipart/mixed; boundary={boundary}")
+
+
+@app.post("/preview/compare")
+async def preview_compare(body: dict = Body(...), x_draft_token: Optional[str] = Header(None)):
+    """
+    Expects JSON { "template_ids": [<id>, ...] or "all", "offset": 0,
+                   "formData": { ... } or "draft_id" + "version",
+                   "pdf": false, "thumbnails": false, "format": "json" | "multipart" }
+    Renders one payload against many templates in a single request: HTML
+    previews concurrently, PDFs / one-page thumbnails in parallel on the render pool
+    (one layout per template when both are requested).
+    "all" is paged COMPARE_MAX_TEMPLATES at a time from `offset`; while more
+    remain the response carries "next_offset" (X-Next-Offset for multipart).
+    """
+    want_pdf = bool(body.get("pdf"))
+    want_thumb = bool(body.get("thumbnails"))
+
+    draft_id = int_field(body, "draft_id")
+    if draft_id is not None:
+        draft = await load_draft(draft_id, x_draft_token, int_field(body, "version"))
+        user_data = draft.data or {}
+    else:
+        user_data = body.get("formData") or {}
+    if not isinstance(user_data, dict):
+        raise HTTPException(status_code=422, detail="formData must be an object")
+
+    ids = body.get("template_ids", "all")
+    query = select(TemplateModel).order_by(TemplateModel.id)
+    if ids == "all":
+        offset = max(int_field(body, "offset", 0), 0)
+        query = query.offset(offset)
+    else:
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail='template_ids must be a list of ids or "all"')
+        if len(ids) > settings.COMPARE_MAX_TEMPLATES:
+            raise HTTPException(status_code=400, detail=f"At most {settings.COMPARE_MAX_TEMPLATES} templates per comparison")
+        query = query.where(TemplateModel.id.in_(ids))
+    async with async_session_maker() as session:
+        result = await session.execute(query.limit(settings.COMPARE_MAX_TEMPLATES + 1))
+        templates = result.scalars().all()
+
+    if not templates:
+        raise HTTPException(status_code=404, detail="Template not found")
+    next_offset = None
+    if ids == "all":
+        if len(templates) > settings.COMPARE_MAX_TEMPLATES:
+            templates = templates[: settings.COMPARE_MAX_TEMPLATES]
+            next_offset = offset + len(templates)
+    else:
+        templates.sort(key=lambda t: ids.index(t.id))
+
+    # Resolve the payload once for every template
+    preview_data = photos.with_photo_url(user_data, PHOTO_DIR)
+    pdf_data = photos.with_photo_url(user_data, PHOTO_DIR, for_pdf=True)
+
+    async def render_one(tpl):
+        item = {"template_id": tpl.id, "name": tpl.name}
+        t0 = time.perf_counter()
+        try:
+            item["html"] = await asyncio.to_thread(
+                render_html_from_template,
+                tpl.html, tpl.css, preview_data, settings.RENDER_PREVIEW_TIMEOUT_MS,
+            )
+            if want_pdf or want_thumb:
+                pdf_html = item["html"]
+                if pdf_data is not preview_data:
+                    pdf_html = await asyncio.to_thread(
+                        render_html_from_template,
+                        tpl.html, tpl.css, pdf_data, settings.RENDER_PREVIEW_TIMEOUT_MS,
+                    )
+                if want_pdf and want_thumb:
+                    # One layout in one child for both outputs
+                    item["pdf"], item["thumbnail"] = await render_pool.render_pdf(pdf_html, css=tpl.css, thumbnail=True)
+                elif want_pdf:
+                    item["pdf"] = await render_pool.render_pdf(pdf_html, css=tpl.css)
+                else:
+                    item["thumbnail"] = await render_pool.render_pdf(pdf_html, css=tpl.css, max_pages=1)
+        except RenderError as e:
+            item["error"] = e.as_dict()
+        item["render_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        return item
+
+    results = await asyncio.gather(*(render_one(t) for t in templates))
+
+    if body.get("format") == "multipart":
+        parts, index = [], []
+        for item in results:
+            tid = item["template_id"]
+            if "html" in item:
+                parts.append((f"{tid}.html", "text/html; charset=utf-8", item.pop("html").encode("utf-8")))
+            for key, suffix in (("pdf", "pdf"), ("thumbnail", "thumb.pdf")):
+                if key in item:
+                    parts.append((f"{tid}.{suffix}", "application/pdf", item.pop(key)))
+            index.append(item)
+        parts.insert(0, ("index.json", "application/json", json.dumps(index).encode("utf-8")))
+        response = multipart_response(parts)
+        if next_offset is not None:
+            response.headers["X-Next-Offset"] = str(next_offset)
+        return response
+
+    for item in results:
+        for key in ("pdf", "thumbnail"):
+            if key in item:
+                item[key] = base64.b64encode(item[key]).decode("ascii")
+    return {"results": results, "next_offset": next_offset}
+
+
 # ---------------- GENERATE PDF ----------------
 @app.post("/generate")
-async def generate_resume(data: dict = Body(...)):
+@profiling.traced("generate")
+async def generate_resume(data: dict = Body(...), x_draft_token: Optional[str] = Header(None)):
     """
     Expects JSON { "template_id": <id>, "formData": { ... } }
+    or { "template_id": <id>, "draft_id": <id>, "version": <n> } for a saved draft.
     Returns generated PDF as a FileResponse.
     """
-    template_id = data.get("template_id")
+    template_id = int_field(data, "template_id")
     user_data = data.get("formData", {})
+    draft_id = int_field(data, "draft_id")
 
     if not template_id:
         raise HTTPException(status_code=400, detail="Missing template_id")
 
+    cache_key = None
+    if draft_id is not None:
+        draft = await load_draft(draft_id, x_draft_token, int_field(data, "version"))
+        cache_key = ("pdf", template_id, draft.id, draft.version)
+        cached = render_cache.get(cache_key)
+        if cached and os.path.exists(cached):
+            return FileResponse(cached, filename=os.path.basename(cached), media_type="application/pdf")
+        user_data = draft.data or {}
+    profiling.annotate(template_id, user_data)
+
     async with async_session_maker() as session:
-        result = await session.execute(select(TemplateModel).where(TemplateModel.id == int(template_id)))
+        result = await session.execute(select(TemplateModel).where(TemplateModel.id == template_id))
         tpl = result.scalar_one_or_none()
 
     if not tpl:
         raise HTTPException(status_code=404, detail="Template not found")
 
+    user_data = photos.with_photo_url(user_data, PHOTO_DIR, for_pdf=True)
+
     # ✅ Predefine PDF path early
     filename = f"resume_{template_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
     pdf_path = os.path.join(PDF_DIR, filename)
     os.makedirs(PDF_DIR, exist_ok=True)
 
     try:
-        # Render HTML
-        full_html = render_html_from_template(tpl.html, tpl.css or "", user_data)
-
-        # Generate PDF safely
-        HTML(string=full_html).write_pdf(pdf_path, stylesheets=[CSS(string=tpl.css or "")])
+        # Render HTML and PDF in a CPU/memory/time-limited child process
+        await render_pool.render_template_pdf(tpl.html, tpl.css or "", user_data, pdf_path)
 
         if not os.path.exists(pdf_path):
             raise Exception("PDF file not created")
 
         print(f"✅ PDF successfully generated at {pdf_path}")
+        if cache_key:
+            render_cache.put(cache_key, pdf_path)
+            async with async_session_maker() as session:
+                saved = await session.get(ResumeModel, draft.id)
+                if saved and saved.version == draft.version:
+                    saved.pdf_path = pdf_path
+                    await session.commit()
         return FileResponse(pdf_path, filename=filename, media_type="application/pdf")
 
+    except RenderError:
+        raise
     except Exception as e:
         print("❌ PDF generation failed:", str(e))
-        # Optional: Write failing HTML for debug
-        debug_path = os.path.join(PDF_DIR, f"failed_{template_id}.html")
-        with open(debug_path, "w", encoding="utf-8") as f:
-            f.write(full_html if 'full_html' in locals() else "No HTML rendered.")
         raise HTTPException(status_code=500, detail=f"PDF generation failed: {e}")
 
 
 
+# ---------------- DRAFTS ----------------
+@app.post("/api/drafts")
+async def create_draft(body: dict = Body(...), x_draft_token: Optional[str] = Header(None)):
+    """
+    Expects JSON { "data": { ... }, "template_id": <id, optional> }.
+    Issues a new owner token when the X-Draft-Token header is absent.
+    """
+    data = body.get("data") or {}
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=422, detail="Draft data must be an object")
+    token = x_draft_token or drafts.new_owner_token()
+    template_id = int_field(body, "template_id")
+
+    async with async_session_maker() as session:
+        draft = ResumeModel(
+            owner_token=token,
+            template_id=template_id or None,
+            data=data,
+            version=1,
+        )
+        session.add(draft)
+        await session.commit()
+
+    return {**draft_summary(draft), "token": token}
+
+
+@app.get("/api/drafts")
+async def list_drafts(x_draft_token: Optional[str] = Header(None)):
+    if not x_draft_token:
+        raise HTTPException(status_code=401, detail="Missing X-Draft-Token header")
+    async with async_session_maker() as session:
+        result = await session.execute(
+            select(ResumeModel)
+            .where(ResumeModel.owner_token == x_draft_token)
+            .order_by(ResumeModel.updated_at.desc())
+        )
+        return [draft_summary(d) for d in result.scalars().all()]
+
+
+@app.get("/api/drafts/{draft_id}")
+async def get_draft(draft_id: int, x_draft_token: Optional[str] = Header(None)):
+    draft = await load_draft(draft_id, x_draft_token)
+    return {**draft_summary(draft), "data": draft.data or {}}
+
+
+@app.patch("/api/drafts/{draft_id}")
+async def patch_draft(draft_id: int, body: dict = Body(...), x_draft_token: Optional[str] = Header(None)):
+    """
+    Expects JSON { "base_version": <n>, "ops": [ RFC 6902 operations ],
+    "template_id": <id, optional> }. Returns the new version.
+    """
+    base_version = int_field(body, "base_version")
+    if base_version is None:
+        raise HTTPException(status_code=400, detail="Missing base_version")
+    draft = await load_draft(draft_id, x_draft_token, base_version)
+
+    try:
+        data = drafts.apply_patch(draft.data or {}, body.get("ops", []))
+    except drafts.PatchError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid patch: {e}")
+    template_id = int_field(body, "template_id") or draft.template_id
+    updated_at = datetime.now(timezone.utc)
+
+    # Compare-and-swap on version: SQLite ignores SELECT ... FOR UPDATE, so
+    # only the conditional UPDATE keeps concurrent patches from both landing
+    async with async_session_maker() as session:
+        result = await session.execute(
+            update(ResumeModel)
+            .where(ResumeModel.id == draft_id, ResumeModel.version == base_version)
+            .values(
+                data=data,
+                template_id=template_id,
+                version=ResumeModel.version + 1,
+                updated_at=updated_at,
+                pdf_path=None,
+            )
+        )
+        await session.commit()
+        if result.rowcount == 0:
+            current = await session.get(ResumeModel, draft_id)
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Draft version is stale", "current_version": current.version if current else None},
+            )
+
+    draft.data, draft.template_id, draft.version, draft.updated_at = data, template_id, base_version + 1, updated_at
+    return draft_summary(draft)
+
+
+# ---------------- PHOTOS ----------------
+@app.post("/api/photos")
+async def upload_photo(photo: UploadFile = File(...)):
+    """
+    Decode, downscale and store a profile photo once. Put the returned `id`
+    in formData["photo"]; templates then get `photo_url`.
+    """
+    raw = await photo.read(settings.PHOTO_MAX_UPLOAD_BYTES + 1)
+    if len(raw) > settings.PHOTO_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Photo exceeds {settings.PHOTO_MAX_UPLOAD_BYTES // 2**20} MB")
+    try:
+        manifest = await asyncio.to_thread(photos.process_photo, raw, PHOTO_DIR)
+    except photos.PhotoError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    return {
+        **manifest,
+        "urls": {name: f"/photos/{manifest['id']}/{name}" for name in manifest["variants"]},
+    }
+
+
+@app.get("/photos/{photo_id}/{variant}")
+async def get_photo(photo_id: str, variant: str):
+    path = photos.variant_file(PHOTO_DIR, photo_id, variant)
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Photo not found")
+    # Content-addressed, so it can be cached forever
+    return FileResponse(path, media_type="image/jpeg", headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+
 # ---------------- DOWNLOAD ----------------
 @app.get("/download/{filename}")
 async def download(filename: str):
@@ -204,11 +582,13 @@ async def download(filename: str):
 
 # ---------------- AI GENERATION ----------------
 @app.post("/suggest")
+@profiling.traced("suggest")
 async def suggest(inp: dict = Body(...)):
     try:
         template_id = inp.get("template_id")
         mode = inp.get("mode", "summary")
         data = inp.get("data", {})
+        profiling.annotate(template_id, data)
 
         # You can safely ignore template_id if not needed
         prompt = ""
@@ -225,7 +605,9 @@ async def suggest(inp: dict = Body(...)):
                 f"Provide feedback to make this resume more clear and ATS-friendly:\n{data}"
             )
 
-        ai_resp = await call_openai(prompt)
+        # Just awaits the HTTP call: time it, but don't profile the event loop
+        with profiling.phase("llm", profile=False):
+            ai_resp = await call_openai(prompt)
         return {"text": ai_resp.get("text", "AI service unavailable.")}
 
     except Exception as e:
@@ -270,21 +652,112 @@ async def admin_upload(
     html_text = (await html_file.read()).decode("utf-8", errors="ignore")
     css_text = (await css_file.read()).decode("utf-8", errors="ignore") if css_file else ""
 
+    # Compile, lint and trial-render before anything reaches users
+    try:
+        report = await asyncio.to_thread(template_check.validate_template, html_text, css_text)
+    except template_check.TemplateRejected as e:
+        print(f"❌ Template '{name}' rejected:", e)
+        raise HTTPException(status_code=422, detail={"message": f"Template '{name}' rejected", "problems": e.problems})
+
     async with async_session_maker() as session:
-        tpl = TemplateModel(name=name, description=description, html=html_text, css=css_text, requires_photo=0)
+        tpl = TemplateModel(
+            name=name,
+            description=description,
+            html=html_text,
+            css=css_text,
+            requires_photo=int("photo_url" in html_text),
+            compiled_html=report.compiled_html,
+            preview_ms=report.preview_ms,
+            pdf_ms=report.pdf_ms,
+            pdf_bytes=report.pdf_bytes,
+            validated_at=datetime.now(timezone.utc),
+        )
         session.add(tpl)
         await session.commit()
 
+    # Warm this worker's caches and gallery so the first user doesn't pay for it
+    warm_ms = (await warmup.ensure_warm(tpl)).get("total_ms")
+
+    warnings = "".join(f"<li>{escape(w)}</li>" for w in report.warnings)
     success_html = f"""
     <html><body>
       <h2>✅ Template '{name}' uploaded successfully!</h2>
+      <p>Preview render: {report.preview_ms} ms · PDF render: {report.pdf_ms} ms · PDF size: {report.pdf_bytes // 1024} KB</p>
+      {f"<p>Warm-up: {warm_ms} ms</p>" if warm_ms is not None else ""}
+      {f"<h3>⚠️ Warnings</h3><ul>{warnings}</ul>" if warnings else ""}
       <a href='/admin'>⬅ Back to Admin</a>
     </body></html>
     """
     return HTMLResponse(success_html)
 
 
+# ---------------- ADMIN PROFILING ----------------
+def require_admin(x_admin_password: Optional[str] = Header(None)):
+    if x_admin_password != ADMIN_PASSWORD:
+        raise HTTPException(status_code=401, detail="Missing or wrong X-Admin-Password header")
+
+
+@app.get("/admin/profiling", dependencies=[Depends(require_admin)])
+async def profiling_status():
+    """Armed session, finished captures and the slow-request log (slowest first)."""
+    return profiling.status()
+
+
+@app.post("/admin/profiling", dependencies=[Depends(require_admin)])
+async def start_profiling(body: dict = Body(...)):
+    """
+    Expects JSON { "count": <n>, "mode": "cprofile" | "sampling",
+                   "endpoints": ["preview", "generate", "suggest"] | "preview",
+                   "template_id": <id, optional> }
+    Captures the next `count` matching requests handled by this worker.
+    """
+    template_id = body.get("template_id")
+    try:
+        session = profiling.start_session(
+            count=int(body.get("count", 1)),
+            endpoints=body.get("endpoints"),
+            template_id=int(template_id) if template_id else None,
+            mode=body.get("mode", "cprofile"),
+        )
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    print(f"🔬 Profiling armed: {session.as_dict()}")
+    return session.as_dict()
+
+
+@app.delete("/admin/profiling", dependencies=[Depends(require_admin)])
+async def stop_profiling():
+    profiling.stop_session()
+    return {"session": None}
+
+
+@app.get("/admin/profiling/captures/{capture_id}", dependencies=[Depends(require_admin)])
+async def download_profile(capture_id: str, format: str = "raw"):
+    """
+    Download a capture: a pstats file (.prof) or folded stacks (.folded).
+    `?format=text` returns the top cProfile entries as plain text.
+    """
+    capture = profiling.find_capture(capture_id)
+    if not capture:
+        raise HTTPException(status_code=404, detail="Capture not found")
+    if format == "text" and capture.filename.endswith(".prof"):
+        return PlainTextResponse(profiling.stats_text(capture))
+    media_type = "text/plain" if capture.filename.endswith(".folded") else "application/octet-stream"
+    return Response(
+        capture.data,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{capture.filename}"'},
+    )
+
+
 # ---------------- HEALTH CHECK ----------------
 @app.get("/health")
 async def health():
     return {"status": "ok", "db": DB_PATH, "frontend": FRONTEND_DIR}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness for load balancers: 503 until the warm-up pass has finished."""
+    report = warmup.status.as_dict()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
@@ -1,5 +1,7 @@
 # backend/app/models.py
-from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, func
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Integer, Float, String, Text, JSON, DateTime, Index, func
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -13,10 +15,27 @@ class Template(Base):
     css = Column(Text, nullable=True)
     requires_photo = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Filled in by template_check at upload time; compiled_html is for
+    # inspection only, renders always compile from `html`
+    compiled_html = Column(Text, nullable=True)
+    preview_ms = Column(Float, nullable=True)
+    pdf_ms = Column(Float, nullable=True)
+    pdf_bytes = Column(Integer, nullable=True)
+    validated_at = Column(DateTime(timezone=True), nullable=True)
+
+def _utcnow():
+    return datetime.now(timezone.utc)
 
 class Resume(Base):
+    """A saved resume draft; `version` bumps on every patch."""
     __tablename__ = "resumes"
     id = Column(Integer, primary_key=True)
+    owner_token = Column(String(64), nullable=False)
+    template_id = Column(Integer, nullable=True)
     data = Column(JSON)
+    version = Column(Integer, nullable=False, default=1)
     pdf_path = Column(String(500))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False)
+
+    __table_args__ = (Index("ix_resumes_owner_updated", "owner_token", "updated_at"),)
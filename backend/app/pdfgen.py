@@ -1,34 +1,475 @@
 # backend/app/pdfgen.py
-import os
-from jinja2 import Template as JinjaTemplate
+import re
+import string
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+
+import jinja2
+from jinja2 import filters, nodes
+from jinja2.compiler import CodeGenerator
+from jinja2.exceptions import SecurityError
+from jinja2.sandbox import SandboxedEnvironment
 from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
+
+from backend.app import profiling
+from backend.app.config import settings
+
+
+class RenderError(Exception):
+    """A render was refused or cut short; `code` is stable for API clients."""
+
+    def __init__(self, code: str, message: str, status_code: int = 422):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status_code = status_code
+
+    def as_dict(self):
+        return {"code": self.code, "message": self.message}
+
+
+# ---------------- JINJA SANDBOX ----------------
+class RenderBudget:
+    """Operation, wall-clock and output limits for one template render."""
+
+    def __init__(self, max_ops: int, timeout_ms: float, max_bytes: int):
+        self.max_ops = max_ops
+        self.timeout_ms = timeout_ms
+        self.max_bytes = max_bytes
+        self.ops = 0
+        self.deadline = time.perf_counter() + timeout_ms / 1000
+
+    def check_time(self):
+        if time.perf_counter() > self.deadline:
+            raise RenderError("render_timeout", f"Template render exceeded {self.timeout_ms:.0f} ms", 504)
+
+    def tick(self):
+        self.ops += 1
+        if self.ops > self.max_ops:
+            raise RenderError("render_op_limit", f"Template exceeded {self.max_ops} operations")
+        if self.ops % 64 == 0:
+            self.check_time()
+
+
+_budget: ContextVar = ContextVar("render_budget", default=None)
+
+
+def _tick():
+    budget = _budget.get()
+    if budget is not None:
+        budget.tick()
+
+
+def _check_size(size: int, what: str = "result"):
+    """Refuse to build a string or sequence larger than the render's output limit."""
+    budget = _budget.get()
+    limit = budget.max_bytes if budget is not None else settings.RENDER_MAX_HTML_BYTES
+    if size > limit:
+        raise SecurityError(f"{what} ({size}) exceeds the output limit of {limit}")
+
+
+def _limited_range(*args):
+    rng = range(*args)
+    if len(rng) > settings.RENDER_MAX_OPS:
+        raise SecurityError(f"range of {len(rng)} items exceeds the operation limit")
+    for i in rng:
+        _tick()
+        yield i
+
+
+def _limited_concat(parts):
+    """environment.concat for {% set %} blocks, macros and call blocks."""
+    parts = list(parts)
+    _check_size(sum(map(len, parts)), "block output")
+    return "".join(parts)
+
+
+# printf-style conversion specs; "*" takes its width from the arguments
+_PERCENT_SPEC = re.compile(r"%[#0\- +]*(\*|\d*)(?:\.(\*|\d*))?")
+
+
+def _check_percent_format(fmt: str):
+    for width, precision in _PERCENT_SPEC.findall(fmt):
+        for n in (width, precision):
+            if n == "*":
+                raise SecurityError("'*' widths are not allowed")
+            if n:
+                _check_size(int(n), "format width")
+
+
+def _check_brace_format(fmt: str):
+    try:
+        fields = list(string.Formatter().parse(fmt))
+    except ValueError:
+        return  # malformed; str.format raises the same error itself
+    for _, _, spec, _ in fields:
+        if not spec:
+            continue
+        if "{" in spec:
+            raise SecurityError("nested format specs are not allowed")
+        for n in re.findall(r"\d+", spec):
+            _check_size(int(n), "format width")
+
+
+def _check_str_call(method, args, kwargs):
+    """Bound the result of str methods that can grow a string past its inputs."""
+    target = getattr(method, "__self__", None)
+    name = getattr(method, "__name__", None)
+    if not isinstance(target, str):
+        return
+    if name in ("center", "ljust", "rjust", "zfill") and args and isinstance(args[0], int):
+        _check_size(args[0], f"str.{name} width")
+    elif name == "expandtabs":
+        tabsize = args[0] if args else kwargs.get("tabsize", 8)
+        if isinstance(tabsize, int):
+            _check_size(len(target) + target.count("\t") * tabsize, "str.expandtabs result")
+    elif name == "replace" and len(args) >= 2 and isinstance(args[0], str) and isinstance(args[1], str):
+        old, new = args[:2]
+        hits = len(target) + 1 if not old else target.count(old)
+        _check_size(len(target) + hits * max(len(new) - len(old), 0), "str.replace result")
+    elif name == "join" and args and isinstance(args[0], (list, tuple)):
+        _check_size(len(target) * len(args[0]) + sum(len(x) for x in args[0] if isinstance(x, str)), "str.join result")
+
+
+def _limited_format(value, *args, **kwargs):
+    _check_percent_format(str(value))
+    return filters.do_format(value, *args, **kwargs)
+
+
+def _limited_center(value, width=80):
+    _check_size(width if isinstance(width, int) else 0, "center width")
+    return filters.do_center(value, width)
+
+
+def _limited_indent(s, width=4, first=False, blank=False):
+    indent = len(width) if isinstance(width, str) else width
+    if isinstance(indent, int):
+        _check_size(len(str(s)) + (str(s).count("\n") + 1) * indent, "indent result")
+    return filters.do_indent(s, width, first, blank)
+
+
+def _limited_batch(value, linecount, fill_with=None):
+    # With fill_with, batch(n) builds an n-item list in one builtin call
+    _check_size(linecount if isinstance(linecount, int) else 0, "batch size")
+    return filters.do_batch(value, linecount, fill_with)
+
+
+def _limited_slice(value, slices, fill_with=None):
+    _check_size(slices if isinstance(slices, int) else 0, "slice count")
+    return filters.do_slice(value, slices, fill_with)
+
+
+def _budget_call(name, *args, lineno=None):
+    """`environment.<name>(*args)`; the sandbox's call() charges it one operation."""
+    return nodes.Call(nodes.EnvironmentAttribute(name), list(args), [], None, None, lineno=lineno)
+
+
+class BudgetCodeGenerator(CodeGenerator):
+    """
+    Emits budget checks the sandbox hooks cannot see: one operation per loop
+    iteration (items dropped by a loop filter included) and a size check
+    before the parts of every `~` concatenation are joined.
+    """
+
+    def visit_For(self, node, frame):
+        node.body = [nodes.ExprStmt(_budget_call("budget_tick", lineno=node.lineno), lineno=node.lineno), *node.body]
+        if node.test is not None:
+            node.test = _budget_call("budget_pass", node.test, lineno=node.test.lineno)
+        super().visit_For(node, frame)
+
+    def visit_Concat(self, node, frame):
+        # CodeGenerator.visit_Concat, with the parts sized before they are joined
+        if frame.eval_ctx.volatile:
+            func_name = "(markup_join if context.eval_ctx.volatile else str_join)"
+        elif frame.eval_ctx.autoescape:
+            func_name = "markup_join"
+        else:
+            func_name = "str_join"
+        self.write(f"{func_name}(environment.budget_concat((")
+        for arg in node.nodes:
+            self.visit(arg, frame)
+            self.write(", ")
+        self.write(")))")
+
+
+class LimitedSandboxedEnvironment(SandboxedEnvironment):
+    """
+    Sandbox that charges every attribute lookup, call, loop iteration and
+    intercepted binop against the active RenderBudget, and refuses to build
+    strings or sequences larger than its output limit.
+    """
+
+    code_generator_class = BudgetCodeGenerator
+    concat = staticmethod(_limited_concat)
+    intercepted_binops = frozenset(["+", "*", "**", "%"])
 
-def render_html_from_template(tpl_html: str, css: str, data: dict) -> str:
-    """
-    Combine template HTML (Jinja2) + CSS + data into a full HTML document string.
-    """
-    # ensure we remove any unwanted default subtitle:
-    # tpl_html should not contain "Data Science Student" fixed text.
-    jtpl = JinjaTemplate(tpl_html)
-    body = jtpl.render(**data)
-
-    full = f"""<!doctype html>
-<html>
-<head>
-<meta charset="utf-8">
-<style>
-{css}
-@page {{ size: A4; margin: 1cm; }}
-</style>
-</head>
-<body>
-{body}
-</body>
-</html>"""
-    return full
-
-def generate_pdf_from_html(html_str: str, outpath: str):
-    """Generate a PDF file from rendered HTML string using WeasyPrint."""
-    # WeasyPrint will take the HTML string and write the PDF.
-    HTML(string=html_str).write_pdf(outpath)
-    return outpath
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.globals["range"] = _limited_range
+        # lipsum(n, min, max) builds arbitrarily large text in one call
+        self.globals.pop("lipsum", None)
+        self.filters["format"] = _limited_format
+        self.filters["center"] = _limited_center
+        self.filters["indent"] = _limited_indent
+        self.filters["batch"] = _limited_batch
+        self.filters["slice"] = _limited_slice
+
+    @staticmethod
+    def budget_tick(**_frame_vars):
+        pass
+
+    @staticmethod
+    def budget_pass(value, **_frame_vars):
+        return value
+
+    @staticmethod
+    def budget_concat(parts):
+        _tick()
+        _check_size(sum(len(p) if isinstance(p, str) else len(str(p)) for p in parts), "~ concatenation")
+        return parts
+
+    def getattr(self, obj, attribute):
+        _tick()
+        return super().getattr(obj, attribute)
+
+    def getitem(self, obj, argument):
+        _tick()
+        return super().getitem(obj, argument)
+
+    def call(self, context, obj, /, *args, **kwargs):
+        _tick()
+        _check_str_call(obj, args, kwargs)
+        return super().call(context, obj, *args, **kwargs)
+
+    def wrap_str_format(self, value):
+        wrapper = super().wrap_str_format(value)
+        if wrapper is not None:
+            _check_brace_format(value.__self__)
+        return wrapper
+
+    def call_binop(self, context, operator, left, right):
+        _tick()
+        if operator == "**" and isinstance(right, (int, float)) and abs(right) > 64:
+            raise SecurityError("exponent too large")
+        # Jinja's ** is left-associative, so ((a ** 64) ** 64) ** 64 slips past the exponent check
+        if operator == "**" and isinstance(left, int) and isinstance(right, int) and abs(left).bit_length() * right > 4096:
+            raise SecurityError("power result too large")
+        if operator == "*":
+            for seq, n in ((left, right), (right, left)):
+                if isinstance(seq, (str, list, tuple)) and isinstance(n, int):
+                    _check_size(len(seq) * n, "sequence repetition")
+        elif operator == "+" and isinstance(left, (str, list, tuple)) and isinstance(right, (str, list, tuple)):
+            _check_size(len(left) + len(right), "concatenation")
+        elif operator == "%" and isinstance(left, str):
+            _check_percent_format(left)
+        return super().call_binop(context, operator, left, right)
+
+
+jinja_env = LimitedSandboxedEnvironment()
+
+# Tags the module source stored on Template rows with the Jinja release and
+# sandbox that produced it. The stored source is kept for inspection only and
+# never executed: whoever can write that column would otherwise bypass the sandbox.
+COMPILE_TAG = f"# jinja {jinja2.__version__} limited-sandbox-2\n"
+
+
+def compile_template_source(tpl_html: str) -> str:
+    """Compile Jinja source to Python module source (stored on the Template row)."""
+    return COMPILE_TAG + jinja_env.compile(tpl_html, raw=True)
+
+
+@lru_cache(maxsize=128)
+def get_template(tpl_html: str):
+    """
+    Return a ready jinja2 Template, always compiled from the Jinja source.
+    Cached on the source so each template compiles once per process.
+    """
+    return jinja_env.from_string(tpl_html)
+
+
+def render_body(tpl, data: dict, timeout_ms: float = None, max_bytes: int = None) -> str:
+    """Render a compiled template under a fresh RenderBudget."""
+    budget = RenderBudget(
+        settings.RENDER_MAX_OPS,
+        timeout_ms or settings.RENDER_HTML_TIMEOUT_MS,
+        max_bytes or settings.RENDER_MAX_HTML_BYTES,
+    )
+    token = _budget.set(budget)
+    try:
+        chunks, size = [], 0
+        for chunk in tpl.generate(**(data or {})):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > budget.max_bytes:
+                raise RenderError("output_too_large", f"Rendered HTML exceeds {budget.max_bytes // 1024} KB", 413)
+            budget.check_time()
+        return "".join(chunks)
+    except SecurityError as e:
+        raise RenderError("template_forbidden", f"Template blocked by sandbox: {e}")
+    except RenderError:
+        raise
+    except RecursionError:
+        raise RenderError("template_error", "Template error: recursion too deep")
+    except jinja2.TemplateError as e:
+        raise RenderError("template_error", f"Template error: {e}")
+    except MemoryError:
+        raise  # render_pool reports it as render_memory_limit
+    except Exception as e:
+        # Runtime errors raised by template code itself (1/0, int("x"), ...)
+        raise RenderError("template_error", f"Template error: {type(e).__name__}: {e}")
+    finally:
+        _budget.reset(token)
+
+
+def wrap_document(body: str, css: str) -> str:
+    """Embed a rendered template body and its CSS in a full HTML document."""
+    return f"""
+    <!doctype html>
+    <html>
+      <head>
+        <meta charset="utf-8"/>
+        <meta name="viewport" content="width=device-width,initial-scale=1"/>
+        <style>{css or ''}</style>
+      </head>
+      <body>{body}</body>
+    </html>
+    """
+
+
+def render_html_from_template(tpl_html: str, css: str, data: dict, timeout_ms: float = None) -> str:
+    """Render Jinja template in the sandbox and embed CSS inline."""
+    with profiling.phase("jinja"):
+        body = render_body(get_template(tpl_html), data, timeout_ms=timeout_ms)
+    return wrap_document(body, css)
+
+
+# ---------------- WEASYPRINT ----------------
+# Shared so font discovery happens once; the render fork server preloads this
+# module, so every render child starts with it
+font_config = FontConfiguration()
+
+# WeasyPrint options per output profile. WeasyPrint subsets fonts and
+# compresses streams by default; "strip_metadata" is applied here.
+PDF_PROFILES = {
+    "default": {},
+    # Whole fonts with hinting, for users who edit or re-typeset the PDF
+    "fidelity": {"full_fonts": True, "hinting": True},
+    # Recompress images and cap them at print resolution
+    "balanced": {"optimize_images": True, "jpeg_quality": 85, "dpi": 200},
+    # Smallest download: screen-resolution images, no document metadata
+    "compact": {"optimize_images": True, "jpeg_quality": 70, "dpi": 150, "strip_metadata": True},
+    # Debugging only: readable content streams
+    "uncompressed": {"uncompressed_pdf": True},
+}
+
+if settings.PDF_PROFILE not in PDF_PROFILES:
+    raise ValueError(f"PDF_PROFILE must be one of {', '.join(PDF_PROFILES)}, got '{settings.PDF_PROFILE}'")
+
+# Decoded images keyed by URL, one cache per profile because WeasyPrint bakes
+# the image options into each entry. The render fork server fills them with
+# the templates' images (warmup.warm_render_server) and every render child
+# inherits that copy; a child's own additions (e.g. user photos) die with it.
+# Long-lived processes such as the benchmark reuse them across renders.
+image_caches = {name: {} for name in PDF_PROFILES}
+
+
+def _image_cache(name: str):
+    """
+    The profile's image cache, emptied first once its image data passes
+    PDF_IMAGE_CACHE_MB. Only trimmed between layouts: a document being laid
+    out or written reads its images back from the cache by key.
+    """
+    cache = image_caches[name]
+    size = sum(len(v) for v in cache.values() if isinstance(v, bytes))
+    if size > settings.PDF_IMAGE_CACHE_MB * 2**20:
+        cache.clear()
+    return cache
+
+
+def pdf_options(profile: str = None):
+    """Return (name, WeasyPrint options, strip_metadata) for a profile."""
+    name = profile or settings.PDF_PROFILE
+    if name not in PDF_PROFILES:
+        raise ValueError(f"Unknown PDF profile '{name}'")
+    options = dict(PDF_PROFILES[name])
+    strip = options.pop("strip_metadata", False)
+    return name, options, strip
+
+
+@lru_cache(maxsize=64)
+def get_stylesheet(css: str):
+    """Parsed WeasyPrint stylesheet, cached on the CSS text."""
+    return CSS(string=css, font_config=font_config)
+
+
+def render_document(html_str: str, css: str = None, profile: str = None):
+    """Lay out rendered HTML into a WeasyPrint Document."""
+    name, options, _ = pdf_options(profile)
+    stylesheets = [get_stylesheet(css)] if css else None
+    return HTML(string=html_str).render(
+        stylesheets=stylesheets, font_config=font_config, cache=_image_cache(name), **options
+    )
+
+
+def _drop_producer(document, pdf):
+    pdf.info.pop("Producer", None)
+
+
+def write_document(document, outpath: str = None, profile: str = None):
+    """write_pdf with the output profile's options; returns bytes when no path is given."""
+    _, options, strip = pdf_options(profile)
+    if strip:
+        document.metadata = type(document.metadata)()
+    return document.write_pdf(outpath, finisher=_drop_producer if strip else None, **options)
+
+
+def generate_pdf_from_html(
+    html_str: str,
+    outpath: str = None,
+    css: str = None,
+    max_pages: int = None,
+    timings: dict = None,
+    profile: str = None,
+    thumbnail: bool = False,
+):
+    """
+    Generate a PDF from rendered HTML using WeasyPrint, in-process.
+    Writes to `outpath` and returns it, or returns the PDF bytes when no path is given.
+    `max_pages` keeps only the first pages (e.g. 1 for a thumbnail).
+    `thumbnail=True` also writes the first page from the same layout and
+    returns (pdf, thumbnail_bytes).
+    `timings`, when given, receives pdf_layout_ms and pdf_write_ms.
+    `profile` names an entry of PDF_PROFILES (settings.PDF_PROFILE by default).
+    Request handlers go through render_pool, which runs this under rlimits.
+    """
+    t0 = time.perf_counter()
+    document = render_document(html_str, css, profile)
+    if max_pages:
+        document = document.copy(document.pages[:max_pages])
+    t1 = time.perf_counter()
+    pdf = write_document(document, outpath, profile)
+    result = outpath if outpath else pdf
+    if thumbnail:
+        result = (result, write_document(document.copy(document.pages[:1]), profile=profile))
+    if timings is not None:
+        timings["pdf_layout_ms"] = (t1 - t0) * 1000
+        timings["pdf_write_ms"] = (time.perf_counter() - t1) * 1000
+    return result
+
+
+def generate_pdf_from_template(
+    tpl_html: str, css: str, data: dict, outpath: str = None, timings: dict = None, profile: str = None
+):
+    """
+    Render a template with `data` and lay it out, in-process: the whole of
+    /generate's rendering, so render_pool can run the Jinja step under the
+    same rlimits as WeasyPrint. Returns like generate_pdf_from_html;
+    `timings` also receives jinja_ms.
+    """
+    t0 = time.perf_counter()
+    html_str = render_html_from_template(tpl_html, css, data)
+    if timings is not None:
+        timings["jinja_ms"] = (time.perf_counter() - t0) * 1000
+    return generate_pdf_from_html(html_str, outpath, css, timings=timings, profile=profile)
@@ -0,0 +1,138 @@
+# backend/app/photos.py
+"""
+Profile photo processing.
+
+Uploads are decoded once, auto-rotated, downscaled and recompressed into the
+variants templates need, then stored under a content hash so re-uploading the
+same photo is free. formData only carries the photo id; renders resolve it to
+a processed file, and the PDF variant is squeezed under PHOTO_PDF_BUDGET_BYTES.
+"""
+import hashlib
+import io
+import json
+import os
+
+from PIL import Image, ImageOps
+
+from backend.app.config import settings
+
+
+class PhotoError(ValueError):
+    """The upload is not an image we can use."""
+
+
+def _photo_paths(photo_dir: str, photo_id: str):
+    return os.path.join(photo_dir, f"{photo_id}.json"), os.path.join(photo_dir, f"{photo_id}_{{variant}}.jpg")
+
+
+def load_manifest(photo_dir: str, photo_id: str):
+    if not photo_id or len(photo_id) != 32 or not all(c in "0123456789abcdef" for c in photo_id):
+        return None
+    manifest_path, _ = _photo_paths(photo_dir, photo_id)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _decode(raw: bytes, largest: int):
+    try:
+        img = Image.open(io.BytesIO(raw))
+        # open() only reads the header; refuse bombs before anything is decoded
+        width, height = img.size
+        if width * height > settings.PHOTO_MAX_PIXELS:
+            raise PhotoError("Image has too many pixels")
+        # JPEG can decode straight to a reduced scale, skipping most of the work
+        img.draft("RGB", (largest, largest))
+        img = ImageOps.exif_transpose(img)
+        img.load()
+    except PhotoError:
+        raise
+    except Image.DecompressionBombError:
+        raise PhotoError("Image has too many pixels")
+    except Exception:
+        raise PhotoError("Unsupported or corrupt image")
+
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, "white")
+        background.paste(img, mask=img.split()[-1])
+        img = background
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+
+def _encode(img, quality: int) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def _fit_budget(img, quality: int, budget: int):
+    """Lower quality, then size, until the JPEG fits the byte budget."""
+    data = _encode(img, quality)
+    while len(data) > budget and quality > 45:
+        quality -= 10
+        data = _encode(img, quality)
+    while len(data) > budget and min(img.size) > 64:
+        img = img.resize((int(img.width * 0.8), int(img.height * 0.8)), Image.LANCZOS)
+        data = _encode(img, quality)
+    return img, data, quality
+
+
+def process_photo(raw: bytes, photo_dir: str) -> dict:
+    """
+    Blocking: store the processed variants for an uploaded photo and return
+    its manifest. Identical uploads return the existing manifest untouched.
+    """
+    photo_id = hashlib.sha256(raw).hexdigest()[:32]
+    existing = load_manifest(photo_dir, photo_id)
+    if existing:
+        return existing
+
+    sizes = settings.PHOTO_SIZES
+    img = _decode(raw, max(sizes.values()))
+    os.makedirs(photo_dir, exist_ok=True)
+    manifest_path, variant_path = _photo_paths(photo_dir, photo_id)
+
+    variants = {}
+    for name, size in sorted(sizes.items(), key=lambda kv: -kv[1]):
+        variant = img.copy()
+        variant.thumbnail((size, size), Image.LANCZOS)
+        if name == settings.PHOTO_PDF_VARIANT:
+            variant, data, quality = _fit_budget(variant, settings.PHOTO_JPEG_QUALITY, settings.PHOTO_PDF_BUDGET_BYTES)
+        else:
+            quality = settings.PHOTO_JPEG_QUALITY
+            data = _encode(variant, quality)
+        with open(variant_path.format(variant=name), "wb") as f:
+            f.write(data)
+        variants[name] = {"width": variant.width, "height": variant.height, "bytes": len(data), "quality": quality}
+
+    manifest = {"id": photo_id, "width": img.width, "height": img.height, "variants": variants}
+    # Manifest last: its presence marks the photo as complete
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def variant_file(photo_dir: str, photo_id: str, variant: str):
+    manifest = load_manifest(photo_dir, photo_id)
+    if not manifest or variant not in manifest["variants"]:
+        return None
+    return _photo_paths(photo_dir, photo_id)[1].format(variant=variant)
+
+
+def with_photo_url(data: dict, photo_dir: str, for_pdf: bool = False) -> dict:
+    """
+    Resolve formData["photo"] (a photo id) into `photo_url` for templates:
+    an HTTP URL for previews, a local file URL of the budgeted variant for PDFs.
+    """
+    photo_id = (data or {}).get("photo")
+    if not isinstance(photo_id, str):
+        return data
+    path = variant_file(photo_dir, photo_id, settings.PHOTO_PDF_VARIANT)
+    if not path:
+        return data
+    url = f"file://{path}" if for_pdf else f"/photos/{photo_id}/{settings.PHOTO_PDF_VARIANT}"
+    return {**data, "photo_url": url}
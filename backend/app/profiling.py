@@ -0,0 +1,370 @@
+# backend/app/profiling.py
+"""
+On-demand profiling for /preview, /generate and /suggest.
+
+Every traced request records per-phase timings (Jinja, render queue, WeasyPrint
+layout and PDF write in the render child, LLM call); requests slower than
+PROFILE_SLOW_MS land in a ring buffer with their payload and output sizes.
+An admin can arm a session that captures a cProfile or sampling profile of the
+next N matching requests. The render child profiles itself and ships its stats
+back, so captures cover WeasyPrint too. Downloads are pstats files (snakeviz,
+flameprof, gprof2dot) or folded stacks (flamegraph.pl, speedscope).
+
+State is per worker process: with several gunicorn workers a session only
+captures requests that land on the worker which armed it.
+"""
+import cProfile
+import functools
+import io
+import json
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from backend.app.config import settings
+
+MODES = ("cprofile", "sampling")
+ENDPOINTS = ("preview", "generate", "suggest")
+
+_current: ContextVar = ContextVar("request_trace", default=None)
+
+
+# ---------------- PROFILERS ----------------
+def _fold(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno or code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class _Sampler(threading.Thread):
+    """Periodically snapshots one thread's stack into folded-stack counts."""
+
+    def __init__(self, thread_id: int, interval_s: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_fold(frame)] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+
+class Profiler:
+    """
+    Profile the enclosed block on the current thread. `result` is a pstats
+    dict (cprofile), folded-stack counts (sampling) or None (mode None).
+    """
+
+    def __init__(self, mode: str = None):
+        self.mode = mode
+        self.result = None
+        self._impl = None
+
+    def __enter__(self):
+        if self.mode == "cprofile":
+            self._impl = cProfile.Profile()
+            try:
+                self._impl.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler; skip rather than fail the request
+                self._impl = None
+        elif self.mode == "sampling":
+            self._impl = _Sampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+            self._impl.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.mode == "cprofile" and self._impl is not None:
+            self._impl.disable()
+            self._impl.create_stats()
+            self.result = self._impl.stats
+        elif self.mode == "sampling":
+            self.result = dict(self._impl.stop())
+        return False
+
+
+class _LoadedStats:
+    """Lets pstats.Stats.add() merge a raw stats dict (e.g. from a render child)."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+# ---------------- TRACES ----------------
+class RequestTrace:
+    def __init__(self, endpoint: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.endpoint = endpoint
+        self.template_id = None
+        self.payload = None
+        self.mode = None
+        self.phases = {}
+        self.output_bytes = None
+        self.status = "ok"
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.total_ms = None
+        self._t0 = time.perf_counter()
+        self._stats = []  # pstats dicts from each profiled phase / child
+        self._samples = Counter()
+
+    def record(self, name: str, ms: float):
+        self.phases[name] = round(self.phases.get(name, 0) + ms, 2)
+
+    def add_profile(self, result, prefix: str):
+        if not result:
+            return
+        if self.mode == "cprofile":
+            self._stats.append(result)
+        else:
+            for stack, count in result.items():
+                self._samples[f"{prefix};{stack}"] += count
+
+    def add_child(self, timings: dict, profile_result):
+        """Merge what the WeasyPrint render child measured about itself."""
+        for name, ms in (timings or {}).items():
+            self.record(name, ms)
+        self.add_profile(profile_result, "render_child")
+
+    def payload_bytes(self):
+        if self.payload is None:
+            return None
+        if isinstance(self.payload, (str, bytes)):
+            return len(self.payload)
+        return len(json.dumps(self.payload, default=str))
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "endpoint": self.endpoint,
+            "template_id": self.template_id,
+            "status": self.status,
+            "started_at": self.started_at,
+            "total_ms": self.total_ms,
+            "phases": self.phases,
+            "payload_bytes": self.payload_bytes(),
+            "output_bytes": self.output_bytes,
+            "mode": self.mode,
+        }
+
+    def export(self):
+        """Return (bytes, filename) of the captured profile."""
+        if self.mode == "cprofile":
+            stats = pstats.Stats(*(_LoadedStats(raw) for raw in self._stats))
+            return marshal.dumps(stats.stats), f"{self.endpoint}_{self.id}.prof"
+        folded = "".join(f"{stack} {count}\n" for stack, count in self._samples.most_common())
+        return folded.encode("utf-8"), f"{self.endpoint}_{self.id}.folded"
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str, profile: bool = True):
+    """
+    Time a block of the current request. While the request is being captured
+    the block is also profiled on this thread (pass profile=False for blocks
+    that just await, where the profiler would see other requests' work).
+    """
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    with Profiler(trace.mode if profile else None) as prof:
+        try:
+            yield
+        finally:
+            trace.record(f"{name}_ms", (time.perf_counter() - t0) * 1000)
+    trace.add_profile(prof.result, name)
+
+
+def record(name: str, ms: float):
+    trace = _current.get()
+    if trace is not None:
+        trace.record(name, ms)
+
+
+# ---------------- SESSIONS ----------------
+@dataclass
+class Capture:
+    summary: dict
+    data: bytes
+    filename: str
+
+
+class ProfileSession:
+    def __init__(self, count: int, endpoints=None, template_id: int = None, mode: str = "cprofile"):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if not 0 < count <= settings.PROFILE_MAX_CAPTURES:
+            raise ValueError(f"count must be between 1 and {settings.PROFILE_MAX_CAPTURES}")
+        endpoints = endpoints or ("preview", "generate")
+        if isinstance(endpoints, str):
+            endpoints = [endpoints]
+        if not isinstance(endpoints, (list, tuple)):
+            raise ValueError("endpoints must be an endpoint name or a list of them")
+        endpoints = list(endpoints)
+        unknown = [str(e) for e in endpoints if e not in ENDPOINTS]
+        if unknown:
+            raise ValueError(f"unknown endpoints: {', '.join(unknown)}")
+        self.remaining = count
+        self.endpoints = endpoints
+        self.template_id = template_id
+        self.mode = mode
+        self.created_at = datetime.now(timezone.utc).isoformat()
+
+    def matches(self, endpoint: str, template_id):
+        if endpoint not in self.endpoints:
+            return False
+        return self.template_id is None or template_id == self.template_id
+
+    def as_dict(self):
+        return {
+            "remaining": self.remaining,
+            "endpoints": self.endpoints,
+            "template_id": self.template_id,
+            "mode": self.mode,
+            "created_at": self.created_at,
+        }
+
+
+_lock = threading.Lock()
+session = None
+captures = deque(maxlen=settings.PROFILE_MAX_CAPTURES)
+slow_log = deque(maxlen=settings.PROFILE_SLOW_LOG_SIZE)
+
+
+def start_session(**kwargs) -> ProfileSession:
+    global session
+    with _lock:
+        session = ProfileSession(**kwargs)
+    return session
+
+
+def stop_session():
+    global session
+    with _lock:
+        session = None
+
+
+def find_capture(capture_id: str):
+    return next((c for c in captures if c.summary["id"] == capture_id), None)
+
+
+def status():
+    return {
+        "session": session.as_dict() if session else None,
+        "slow_ms": settings.PROFILE_SLOW_MS,
+        "captures": [c.summary for c in captures],
+        "slowest": sorted(slow_log, key=lambda s: s["total_ms"], reverse=True),
+    }
+
+
+def annotate(template_id=None, payload=None):
+    """
+    Tag the current request with its template and payload, and claim a slot
+    in the armed session if it matches. Call before any rendering starts.
+    """
+    global session
+    trace = _current.get()
+    if trace is None:
+        return
+    trace.template_id = int(template_id) if template_id not in (None, "") else None
+    trace.payload = payload
+    if session is None or trace.mode:
+        return
+    with _lock:
+        if session is not None and session.matches(trace.endpoint, trace.template_id):
+            trace.mode = session.mode
+            session.remaining -= 1
+            if session.remaining <= 0:
+                session = None
+
+
+def _output_bytes(response):
+    body = getattr(response, "body", None)
+    if body is not None:
+        return len(body)
+    path = getattr(response, "path", None)
+    if path and os.path.exists(path):
+        return os.path.getsize(path)
+    if isinstance(response, dict):
+        return len(json.dumps(response, default=str))
+    return None
+
+
+def _finish(trace):
+    trace.total_ms = round((time.perf_counter() - trace._t0) * 1000, 2)
+    if trace.mode:
+        data, filename = trace.export()
+        captures.append(Capture(trace.summary(), data, filename))
+        print(f"🔬 Captured {trace.mode} profile {trace.id} ({trace.endpoint}, {trace.total_ms} ms)")
+    if settings.PROFILE_SLOW_MS and trace.total_ms >= settings.PROFILE_SLOW_MS:
+        slow_log.append(trace.summary())
+
+
+def traced(endpoint: str):
+    """
+    Decorator for async route handlers. When the slow log is off and no
+    session is armed the handler runs untouched.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if not settings.PROFILE_SLOW_MS and session is None:
+                return await fn(*args, **kwargs)
+            trace = RequestTrace(endpoint)
+            token = _current.set(trace)
+            try:
+                response = await fn(*args, **kwargs)
+                trace.output_bytes = _output_bytes(response)
+                return response
+            except BaseException as e:
+                if isinstance(getattr(e, "code", None), str):
+                    trace.status = e.code  # RenderError
+                elif hasattr(e, "status_code"):
+                    trace.status = f"http_{e.status_code}"
+                else:
+                    trace.status = type(e).__name__
+                raise
+            finally:
+                _current.reset(token)
+                _finish(trace)
+
+        return wrapper
+
+    return decorator
+
+
+def stats_text(capture: Capture, limit: int = 40) -> str:
+    """Top functions by cumulative time, for a quick look without tooling."""
+    raw = marshal.loads(capture.data)
+    stats = pstats.Stats(*([_LoadedStats(raw)] if raw else []), stream=io.StringIO())
+    stats.sort_stats("cumulative").print_stats(limit)
+    return stats.stream.getvalue()
@@ -0,0 +1,172 @@
+# backend/app/render_pool.py
+"""
+Bounded WeasyPrint rendering.
+
+Every job runs in its own child with RLIMIT_CPU and RLIMIT_AS set, under a
+wall-clock deadline enforced by the parent. A runaway layout can only take
+down its own child; the worker gets a RenderError back instead.
+
+Children are forked from a fork server started at worker startup, before the
+worker has any threads, with pdfgen (WeasyPrint, fonts) preloaded and the
+template stylesheets and images warmed (backend/app/render_server.py).
+Forking straight from the worker would copy whatever pango/fontconfig locks
+other threads held at that instant and could leave the child hung.
+"""
+import asyncio
+import multiprocessing
+import os
+import resource
+import signal
+import threading
+import time
+from multiprocessing import forkserver
+
+from backend.app import profiling
+from backend.app.config import settings
+from backend.app.pdfgen import RenderError, generate_pdf_from_html, generate_pdf_from_template
+
+_ctx = multiprocessing.get_context("forkserver")
+_ctx.set_forkserver_preload(["backend.app.render_pool", "backend.app.render_server"])
+_slots = asyncio.Semaphore(settings.RENDER_CONCURRENCY or os.cpu_count() or 2)
+_POLL_S = 0.05
+
+
+def start():
+    """Start the fork server now, while this process is still single-threaded."""
+    forkserver.ensure_running()
+
+
+def _vm_bytes() -> int:
+    """Current virtual memory size; RLIMIT_AS is set relative to it."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * resource.getpagesize()
+    except OSError:
+        return 0
+
+
+def _child(conn, fn, args, kwargs, cpu_s, mem_bytes, profile_mode):
+    try:
+        if cpu_s:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_s, cpu_s + 1))
+        if mem_bytes:
+            limit = _vm_bytes() + mem_bytes
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        timings = {}
+        with profiling.Profiler(profile_mode) as prof:
+            result = fn(*args, timings=timings, **kwargs)
+        conn.send(("ok", result, timings, prof.result))
+    except MemoryError:
+        conn.send(("error", "render_memory_limit", f"Render exceeded {mem_bytes // 2**20} MB", 507))
+    except RenderError as e:
+        conn.send(("error", e.code, e.message, e.status_code))
+    except Exception as e:
+        conn.send(("error", "pdf_failed", f"Render failed: {e}", 500))
+    finally:
+        conn.close()
+        # Skip atexit handlers and buffers inherited from the fork server
+        os._exit(0)
+
+
+def _exit_error(exitcode, cpu_s, mem_bytes):
+    if exitcode in (-signal.SIGXCPU, -signal.SIGKILL):
+        # SIGXCPU at the soft CPU limit, SIGKILL at the hard one
+        return RenderError("render_cpu_limit", f"Render exceeded {cpu_s}s of CPU", 504)
+    if exitcode in (-signal.SIGSEGV, -signal.SIGABRT):
+        # Native allocations failing under RLIMIT_AS usually end this way
+        return RenderError("render_memory_limit", f"Render crashed (likely over {mem_bytes // 2**20} MB)", 507)
+    return RenderError("pdf_failed", f"Render process exited with code {exitcode}", 500)
+
+
+def run_job(fn, args=(), kwargs=None, timeout_s=None, cpu_s=None, mem_mb=None, cancel=None, timings=None):
+    """
+    Blocking: run `fn(*args, timings=<dict>, **kwargs)` in a limited child and
+    return its result. `fn` must be a module-level function; its arguments and
+    result cross the process boundary by pickling. Raises RenderError.
+    `cancel` is an optional threading.Event that aborts the job when set;
+    `timings`, when given, receives what the child recorded.
+    """
+    timeout_s = timeout_s or settings.PDF_WALL_TIMEOUT_S
+    cpu_s = settings.PDF_CPU_LIMIT_S if cpu_s is None else cpu_s
+    mem_bytes = (settings.PDF_MEMORY_LIMIT_MB if mem_mb is None else mem_mb) * 2**20
+    # The child profiles itself when the current request is being captured
+    trace = profiling.current()
+
+    recv_conn, send_conn = _ctx.Pipe(duplex=False)
+    proc = _ctx.Process(
+        target=_child,
+        args=(send_conn, fn, args, kwargs or {}, cpu_s, mem_bytes, trace.mode if trace else None),
+        daemon=True,
+    )
+    proc.start()
+    send_conn.close()
+
+    deadline = time.monotonic() + timeout_s
+    message = None
+    try:
+        while not recv_conn.poll(_POLL_S):
+            if cancel is not None and cancel.is_set():
+                raise RenderError("render_cancelled", "Render was cancelled", 499)
+            if time.monotonic() > deadline:
+                raise RenderError("render_timeout", f"Render exceeded {timeout_s:.0f}s", 504)
+            if not proc.is_alive() and not recv_conn.poll():
+                break  # died without reporting; see exit code below
+        try:
+            message = recv_conn.recv()
+        except EOFError:
+            message = None
+    finally:
+        if message is not None:
+            proc.join(1)
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+        recv_conn.close()
+
+    if message is None:
+        raise _exit_error(proc.exitcode, cpu_s, mem_bytes)
+    if message[0] == "ok":
+        _, result, child_timings, profile_result = message
+        if trace is not None:
+            trace.add_child(child_timings, profile_result)
+        if timings is not None:
+            timings.update(child_timings)
+        return result
+    _, code, detail, status_code = message
+    raise RenderError(code, detail, status_code)
+
+
+def run_pdf_job(html_str, outpath=None, css=None, max_pages=None, **limits):
+    """
+    Blocking: render one PDF in a limited child process.
+    Returns `outpath`, or the PDF bytes when no path is given.
+    """
+    return run_job(generate_pdf_from_html, (html_str, outpath), {"css": css, "max_pages": max_pages}, **limits)
+
+
+async def submit(fn, args=(), kwargs=None, **limits):
+    """
+    Async wrapper used by request handlers: waits for a free render slot,
+    runs the job off the event loop and kills the child if the request is
+    cancelled (e.g. the client disconnected).
+    """
+    t0 = time.perf_counter()
+    async with _slots:
+        profiling.record("pdf_queue_ms", (time.perf_counter() - t0) * 1000)
+        cancel = threading.Event()
+        try:
+            return await asyncio.to_thread(run_job, fn, args, kwargs, cancel=cancel, **limits)
+        except asyncio.CancelledError:
+            cancel.set()
+            raise
+
+
+async def render_pdf(html_str, outpath=None, css=None, max_pages=None, thumbnail=False, **limits):
+    """See pdfgen.generate_pdf_from_html; `thumbnail=True` returns (pdf, thumbnail) from one layout."""
+    kwargs = {"css": css, "max_pages": max_pages, "thumbnail": thumbnail}
+    return await submit(generate_pdf_from_html, (html_str, outpath), kwargs, **limits)
+
+
+async def render_template_pdf(tpl_html, css, data, outpath=None, **limits):
+    """Jinja and WeasyPrint in one limited child; see pdfgen.generate_pdf_from_template."""
+    return await submit(generate_pdf_from_template, (tpl_html, css, data, outpath), **limits)
@@ -0,0 +1,9 @@
+# backend/app/render_server.py
+"""
+Preloaded by the render fork server (see render_pool) before it forks any
+child: importing this module warms WeasyPrint's caches in the fork server,
+so every render child inherits them. See warmup.warm_render_server.
+"""
+from backend.app import warmup
+
+warmup.warm_render_server()
@@ -0,0 +1,20 @@
+# backend/app/sample_data.py
+"""
+Sample resume used for template trial renders and warm-up.
+Keep in sync with fillSampleData() in frontend/static/app.js.
+"""
+
+SAMPLE_RESUME = {
+    "name": "John",
+    "title": "Aspiring Data Scientist",
+    "email": "email@example.com",
+    "phone": "+91 9876543210",
+    "summary": "Driven data enthusiast with project experience in ML model development.",
+    "skills": ["Python", "Pandas", "SQL", "Scikit-learn", "Deep Learning"],
+    "experience": ["Intern - Data Cleaning and Analysis", "ML Project - Predictive Model"],
+    "education": {
+        "class10": {"school": "School Name", "year": "2022", "score": "95%"},
+        "inter": {"school": "Junior College", "year": "2024", "score": "88%"},
+        "degree": {"school": "Engineering  College", "year": "2028", "score": "8.6CGPA"},
+    },
+}
@@ -0,0 +1,58 @@
+# backend/app/schema.py
+"""
+Idempotent schema upgrades for the SQLite database.
+
+deploy/gunicorn_conf.py runs `migrate()` once in the gunicorn master before
+any worker boots. Each worker's startup hook runs `ensure_schema` again,
+which is a no-op by then; when several processes do race (e.g. uvicorn
+--workers), a step another process already applied is skipped, not fatal.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+
+from backend.app.db import create_sync_engine
+from backend.app.models import Base, Resume
+
+_ALREADY_APPLIED = ("duplicate column", "already exists", "no such table")
+
+
+def _tolerate_race(fn, *args):
+    try:
+        fn(*args)
+    except OperationalError as e:
+        if not any(msg in str(e.orig).lower() for msg in _ALREADY_APPLIED):
+            raise
+
+
+def ensure_schema(conn):
+    insp = inspect(conn)
+    if insp.has_table("resumes"):
+        cols = {c["name"] for c in insp.get_columns("resumes")}
+        if "version" not in cols:
+            # Legacy resumes table was never written to; rebuild it for drafts
+            _tolerate_race(Resume.__table__.drop, conn)
+    _tolerate_race(Base.metadata.create_all, conn)
+
+    # Add nullable columns introduced after a table was first created
+    insp = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name not in existing and col.nullable:
+                col_type = col.type.compile(dialect=conn.dialect)
+                _tolerate_race(conn.execute, text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}"))
+
+
+def migrate():
+    """Blocking one-shot upgrade with a sync engine (gunicorn master, scripts)."""
+    engine = create_sync_engine()
+    try:
+        with engine.begin() as conn:
+            ensure_schema(conn)
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    migrate()
+    print("✅ Schema up to date")
@@ -0,0 +1,181 @@
+# backend/app/template_check.py
+"""
+Validation and precompilation of admin-uploaded templates.
+
+Compiles the Jinja source, lints the CSS, checks inline image sizes and does a
+timed trial render (HTML preview + PDF) with the sample resume. Anything over
+the configured budgets is rejected before it reaches users.
+"""
+import base64
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+
+import tinycss2
+from jinja2 import TemplateSyntaxError
+from weasyprint import CSS
+
+from backend.app import pdfgen, render_pool
+from backend.app.config import settings
+from backend.app.sample_data import SAMPLE_RESUME
+
+DATA_URI_RE = re.compile(r"data:image/[\w.+-]+;base64,([A-Za-z0-9+/=\s]+)")
+MAX_SELECTOR_DEPTH = 6
+
+
+class TemplateRejected(Exception):
+    """Raised with the list of problems that make a template unusable."""
+
+    def __init__(self, problems):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+@dataclass
+class TemplateReport:
+    compiled_html: str
+    preview_ms: float
+    pdf_ms: float
+    html_bytes: int
+    pdf_bytes: int
+    warnings: list = field(default_factory=list)
+
+
+class _LogCollector(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+# ---------------- STATIC CHECKS ----------------
+def check_inline_images(text: str, label: str):
+    problems = []
+    for match in DATA_URI_RE.finditer(text or ""):
+        payload = re.sub(r"\s", "", match.group(1))
+        size = len(payload) * 3 // 4
+        if size > settings.TEMPLATE_MAX_INLINE_IMAGE_BYTES:
+            problems.append(
+                f"{label}: inline image of {size // 1024} KB exceeds "
+                f"{settings.TEMPLATE_MAX_INLINE_IMAGE_BYTES // 1024} KB budget"
+            )
+        else:
+            try:
+                base64.b64decode(payload, validate=True)
+            except ValueError:
+                problems.append(f"{label}: inline image is not valid base64")
+    return problems
+
+
+def _selector_warnings(selector: str):
+    warnings = []
+    parts = selector.split()
+    if len(parts) > MAX_SELECTOR_DEPTH:
+        warnings.append(f"CSS selector '{selector}' is {len(parts)} levels deep")
+    if any(p == "*" for p in parts[1:]) or ":has(" in selector:
+        warnings.append(f"CSS selector '{selector}' forces a full-tree match")
+    return warnings
+
+
+def _lint_rules(rules, problems, warnings):
+    for rule in rules:
+        if rule.type == "error":
+            problems.append(f"CSS line {rule.source_line}: {rule.message}")
+        elif rule.type == "qualified-rule":
+            for selector in tinycss2.serialize(rule.prelude).split(","):
+                warnings.extend(_selector_warnings(selector.strip()))
+        elif rule.type == "at-rule" and rule.lower_at_keyword in ("media", "supports") and rule.content:
+            nested = tinycss2.parse_rule_list(rule.content, skip_comments=True, skip_whitespace=True)
+            _lint_rules(nested, problems, warnings)
+
+
+def check_css(css: str):
+    """Return (problems, warnings): parse errors reject, everything else warns."""
+    problems, warnings = [], []
+    rules = tinycss2.parse_stylesheet(css or "", skip_comments=True, skip_whitespace=True)
+    _lint_rules(rules, problems, warnings)
+
+    # WeasyPrint logs declarations it will ignore; surface them to the admin
+    collector = _LogCollector()
+    wp_logger = logging.getLogger("weasyprint")
+    wp_logger.addHandler(collector)
+    try:
+        CSS(string=css or "")
+    except Exception as e:
+        problems.append(f"CSS could not be loaded: {e}")
+    finally:
+        wp_logger.removeHandler(collector)
+    warnings.extend(collector.messages)
+    return problems, warnings
+
+
+# ---------------- TRIAL RENDER ----------------
+def trial_render_html(tpl_html: str, css: str, timings: dict = None):
+    """
+    Render the sample resume in the sandbox with the upload budgets.
+    Runs in a render_pool child; `timings` receives jinja_ms.
+    """
+    t0 = time.perf_counter()
+    body = pdfgen.render_body(
+        pdfgen.get_template(tpl_html),
+        SAMPLE_RESUME,
+        timeout_ms=settings.TEMPLATE_PREVIEW_BUDGET_MS,
+        max_bytes=settings.TEMPLATE_MAX_HTML_BYTES,
+    )
+    if timings is not None:
+        timings["jinja_ms"] = (time.perf_counter() - t0) * 1000
+    return pdfgen.wrap_document(body, css)
+
+
+def validate_template(tpl_html: str, css: str) -> TemplateReport:
+    """Run every check; raises TemplateRejected or returns the measured costs."""
+    problems = []
+    for label, text in (("HTML", tpl_html), ("CSS", css)):
+        if len((text or "").encode("utf-8")) > settings.TEMPLATE_MAX_SOURCE_BYTES:
+            problems.append(f"{label} source exceeds {settings.TEMPLATE_MAX_SOURCE_BYTES // 1024} KB")
+        problems.extend(check_inline_images(text, label))
+
+    try:
+        compiled = pdfgen.compile_template_source(tpl_html)
+    except TemplateSyntaxError as e:
+        problems.append(f"Jinja syntax error on line {e.lineno}: {e.message}")
+        compiled = None
+
+    css_problems, warnings = check_css(css)
+    problems.extend(css_problems)
+    if problems:
+        raise TemplateRejected(problems)
+
+    timings = {}
+    try:
+        html = render_pool.run_job(trial_render_html, (tpl_html, css), timings=timings)
+    except pdfgen.RenderError as e:
+        raise TemplateRejected([f"Preview render: {e.message}"])
+    preview_ms = timings["jinja_ms"]
+
+    t0 = time.perf_counter()
+    try:
+        # Allow some slack over the budget so we can report the measured cost
+        pdf = render_pool.run_pdf_job(html, css=css, timeout_s=settings.TEMPLATE_PDF_BUDGET_MS / 1000 * 2)
+    except pdfgen.RenderError as e:
+        raise TemplateRejected([f"Trial PDF render: {e.message}"])
+    pdf_ms = (time.perf_counter() - t0) * 1000
+
+    if pdf_ms > settings.TEMPLATE_PDF_BUDGET_MS:
+        problems.append(f"PDF render took {pdf_ms:.0f} ms (budget {settings.TEMPLATE_PDF_BUDGET_MS} ms)")
+    if len(pdf) > settings.TEMPLATE_MAX_PDF_BYTES:
+        problems.append(f"PDF is {len(pdf) // 1024} KB (budget {settings.TEMPLATE_MAX_PDF_BYTES // 1024} KB)")
+    if problems:
+        raise TemplateRejected(problems)
+
+    return TemplateReport(
+        compiled_html=compiled,
+        preview_ms=round(preview_ms, 2),
+        pdf_ms=round(pdf_ms, 2),
+        html_bytes=len(html.encode("utf-8")),
+        pdf_bytes=len(pdf),
+        warnings=warnings,
+    )
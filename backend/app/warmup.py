@@ -0,0 +1,174 @@
+# backend/app/warmup.py
+"""
+Cache warming and the pre-rendered template gallery.
+
+At startup (and after each admin upload) every template's Jinja source is
+compiled into this worker's template cache, and the sample resume is rendered
+on the render pool into a gallery entry (preview HTML, sample PDF, one-page
+thumbnail PDF). A template whose sample render fails is recorded in
+`status.templates` with its error and is not retried by gallery requests.
+
+WeasyPrint's caches live in the render fork server instead: before it forks
+its first child it runs warm_render_server(), which parses every template's
+CSS and lays out its sample resume once. Every render child starts from that
+state; what a child adds to the caches dies with it. Templates uploaded later
+are warmed there on the next worker restart.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from backend.app import pdfgen, render_pool
+from backend.app.db import create_sync_engine
+from backend.app.models import Template
+from backend.app.sample_data import SAMPLE_RESUME
+
+
+class WarmupStatus:
+    def __init__(self):
+        self.ready = False
+        self.started_at = None
+        self.finished_at = None
+        self.total_ms = None
+        self.error = None
+        self.templates = {}  # template id -> timings or error
+
+    def as_dict(self):
+        return {
+            "ready": self.ready,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "total_ms": self.total_ms,
+            "error": self.error,
+            "templates": self.templates,
+        }
+
+
+status = WarmupStatus()
+
+# template id -> {"html": str, "pdf": bytes, "thumbnail": bytes}
+gallery = {}
+
+
+def _ms(t0):
+    return round((time.perf_counter() - t0) * 1000, 2)
+
+
+def render_sample(tpl_html: str, css: str, timings: dict = None):
+    """Runs in a render_pool child: the sample resume as (html, pdf, thumbnail)."""
+    t0 = time.perf_counter()
+    html = pdfgen.render_html_from_template(tpl_html, css, SAMPLE_RESUME)
+    if timings is not None:
+        timings["html_ms"] = (time.perf_counter() - t0) * 1000
+    pdf, thumbnail = pdfgen.generate_pdf_from_html(html, css=css, timings=timings, thumbnail=True)
+    return html, pdf, thumbnail
+
+
+async def warm_template(tpl) -> dict:
+    """Compile one template in this worker and fill its gallery entry. Raises RenderError."""
+    timings = {"name": tpl.name}
+    t_start = time.perf_counter()
+
+    t0 = time.perf_counter()
+    pdfgen.get_template(tpl.html)
+    timings["compile_ms"] = _ms(t0)
+
+    child = {}
+    html, pdf, thumbnail = await render_pool.submit(
+        render_sample, (tpl.html, tpl.css), timings=child
+    )
+    timings["html_ms"] = round(child["html_ms"], 2)
+    timings["layout_ms"] = round(child["pdf_layout_ms"], 2)
+    timings["pdf_ms"] = round(child["pdf_write_ms"], 2)
+
+    gallery[tpl.id] = {"html": html, "pdf": pdf, "thumbnail": thumbnail}
+    timings["total_ms"] = _ms(t_start)
+    return timings
+
+
+async def _warm_and_record(tpl) -> dict:
+    try:
+        status.templates[tpl.id] = await warm_template(tpl)
+    except Exception as e:
+        status.templates[tpl.id] = {"name": tpl.name, "error": str(e)}
+        print(f"⚠️ Warm-up failed for template {tpl.id} ({tpl.name}):", e)
+    return status.templates[tpl.id]
+
+
+# template id -> in-flight warm-up, shared by concurrent callers
+_pending = {}
+
+
+async def ensure_warm(tpl) -> dict:
+    """
+    Warm `tpl` unless a warm-up for it is already running, and return its
+    status entry (timings, or {"error": ...}). A caller that is cancelled
+    does not cancel the render other callers are waiting on.
+    """
+    task = _pending.get(tpl.id)
+    if task is None:
+        task = asyncio.ensure_future(_warm_and_record(tpl))
+        _pending[tpl.id] = task
+        task.add_done_callback(lambda _: _pending.pop(tpl.id, None))
+    return await asyncio.shield(task)
+
+
+async def warm_templates(templates) -> dict:
+    """Warm every template one at a time, recording timings or the error per id."""
+    for tpl in templates:
+        await ensure_warm(tpl)
+    return status.templates
+
+
+async def warm_all(fetch_templates):
+    """
+    Warm the whole catalogue on the render pool, then flip readiness.
+    Readiness flips even if warm-up fails: cold is slow, not broken.
+    """
+    status.ready = False
+    status.started_at = datetime.now(timezone.utc).isoformat()
+    t0 = time.perf_counter()
+    try:
+        templates = await fetch_templates()
+        await warm_templates(templates)
+    except Exception as e:
+        status.error = str(e)
+        print("⚠️ Warm-up aborted:", e)
+    finally:
+        status.total_ms = _ms(t0)
+        status.finished_at = datetime.now(timezone.utc).isoformat()
+        status.ready = True
+    print(f"🔥 Warm-up finished: {len(status.templates)} templates in {status.total_ms} ms")
+
+
+def warm_render_server():
+    """
+    Blocking; runs in the render fork server before it forks (see
+    backend/app/render_server.py). Fills the stylesheet and image caches and
+    pays the first-layout cost so render children inherit them. Never raises:
+    a cold fork server is slow, not broken.
+    """
+    t0 = time.perf_counter()
+    engine = create_sync_engine()
+    try:
+        with engine.connect() as conn:
+            templates = conn.execute(
+                select(Template.id, Template.name, Template.html, Template.css).order_by(Template.id)
+            ).all()
+    except Exception as e:
+        print("⚠️ Render server warm-up skipped:", e)
+        return
+    finally:
+        engine.dispose()
+
+    warmed = 0
+    for tpl in templates:
+        try:
+            html = pdfgen.render_html_from_template(tpl.html, tpl.css, SAMPLE_RESUME)
+            pdfgen.render_document(html, tpl.css)
+            warmed += 1
+        except Exception as e:
+            print(f"⚠️ Render server warm-up failed for template {tpl.id} ({tpl.name}):", e)
+    print(f"🔥 Render server warmed {warmed} templates in {_ms(t0)} ms")
@@ -0,0 +1,347 @@
+# backend/bench/loadtest.py
+"""
+Locust-style load test for the full ResumeXpert app.
+
+Virtual users loop over a weighted mix of tasks (browse templates, preview,
+generate PDF, AI suggest) with a think time between requests. Per endpoint we
+report p50/p95/p99 latency, throughput and error rate.
+
+Two modes:
+
+  # drive an already running app
+  python -m backend.bench.loadtest --target http://127.0.0.1:8000 --users 20 --duration 60
+
+  # boot the stub LLM + gunicorn for every workers x render-concurrency
+  # combination, load each one and recommend a deployment setting
+  python -m backend.bench.loadtest --sweep --workers 1,2,4 --render-concurrency 1,2,4 --users 30
+
+The app runs under uvicorn's worker class, so gunicorn's `threads` setting
+does not apply (it only affects the gthread worker). Within a worker the
+knob that matters is RENDER_CONCURRENCY, the number of PDF jobs it runs at
+once (include 0 to measure the default, one per CPU).
+
+Needs a seeded database (python -m backend.app.init_db) and, for --sweep,
+gunicorn installed in the environment.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import httpx
+
+from backend.app.sample_data import SAMPLE_RESUME
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+GUNICORN_CONF = os.path.join(ROOT_DIR, "deploy", "gunicorn_conf.py")
+
+# Relative weights of each task in the traffic mix
+DEFAULT_MIX = {"browse": 5, "preview": 8, "generate": 2, "suggest": 1}
+
+
+# ---------------- STATS ----------------
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+
+@dataclass
+class Stats:
+    latencies: dict = field(default_factory=lambda: defaultdict(list))
+    errors: dict = field(default_factory=lambda: defaultdict(int))
+    started: float = 0.0
+    finished: float = 0.0
+
+    def record(self, endpoint, seconds, ok):
+        self.latencies[endpoint].append(seconds * 1000)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    @property
+    def elapsed(self):
+        return max(self.finished - self.started, 1e-9)
+
+    def summary(self):
+        rows = {}
+        total = failed = 0
+        every = []
+        for endpoint, lat in sorted(self.latencies.items()):
+            errs = self.errors.get(endpoint, 0)
+            rows[endpoint] = {
+                "requests": len(lat),
+                "rps": round(len(lat) / self.elapsed, 2),
+                "p50_ms": round(percentile(lat, 50), 1),
+                "p95_ms": round(percentile(lat, 95), 1),
+                "p99_ms": round(percentile(lat, 99), 1),
+                "error_rate": round(errs / len(lat), 4) if lat else 0.0,
+            }
+            total += len(lat)
+            failed += errs
+            every.extend(lat)
+        rows["ALL"] = {
+            "requests": total,
+            "rps": round(total / self.elapsed, 2),
+            "p50_ms": round(percentile(every, 50), 1),
+            "p95_ms": round(percentile(every, 95), 1),
+            "p99_ms": round(percentile(every, 99), 1),
+            "error_rate": round(failed / total, 4) if total else 0.0,
+        }
+        return rows
+
+
+def print_summary(rows, title=""):
+    if title:
+        print(f"\n=== {title} ===")
+    print(f"{'endpoint':<26}{'reqs':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err%':>8}")
+    for endpoint, r in rows.items():
+        print(
+            f"{endpoint:<26}{r['requests']:>7}{r['rps']:>9.2f}{r['p50_ms']:>9.1f}"
+            f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['error_rate'] * 100:>8.2f}"
+        )
+
+
+# ---------------- SCENARIOS ----------------
+class VirtualUser:
+    """One simulated visitor; every task records its own timings."""
+
+    def __init__(self, client, stats, template_ids):
+        self.client = client
+        self.stats = stats
+        self.template_ids = template_ids
+
+    async def _timed(self, endpoint, coro):
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            resp = await coro
+            ok = resp.status_code < 400
+            return resp
+        except httpx.HTTPError:
+            return None
+        finally:
+            self.stats.record(endpoint, time.perf_counter() - t0, ok)
+
+    async def browse(self):
+        await self._timed("GET /api/templates", self.client.get("/api/templates"))
+        tid = random.choice(self.template_ids)
+        await self._timed("GET /api/templates/{id}", self.client.get(f"/api/templates/{tid}"))
+
+    async def preview(self):
+        form = {"template_id": str(random.choice(self.template_ids)), "data_json": json.dumps(SAMPLE_RESUME)}
+        await self._timed("POST /preview", self.client.post("/preview", data=form))
+
+    async def generate(self):
+        body = {"template_id": random.choice(self.template_ids), "formData": SAMPLE_RESUME}
+        await self._timed("POST /generate", self.client.post("/generate", json=body))
+
+    async def suggest(self):
+        body = {"template_id": random.choice(self.template_ids), "data": SAMPLE_RESUME, "mode": random.choice(["summary", "enhance"])}
+        await self._timed("POST /suggest", self.client.post("/suggest", json=body))
+
+
+async def _user_loop(user, mix, deadline, think):
+    tasks = list(mix)
+    weights = [mix[t] for t in tasks]
+    while time.monotonic() < deadline:
+        await getattr(user, random.choices(tasks, weights)[0])()
+        if think:
+            await asyncio.sleep(random.uniform(0, think))
+
+
+async def run_load(base_url, users=10, duration=30.0, spawn_rate=5.0, mix=None, think=1.0, timeout=120.0):
+    """Run the traffic mix against base_url and return the Stats."""
+    mix = mix or DEFAULT_MIX
+    stats = Stats()
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        resp = await client.get("/api/templates")
+        resp.raise_for_status()
+        template_ids = [t["id"] for t in resp.json()]
+        if not template_ids:
+            raise SystemExit("No templates in the database — run python -m backend.app.init_db first.")
+
+        stats.started = time.monotonic()
+        deadline = stats.started + duration
+        workers = []
+        for i in range(users):
+            user = VirtualUser(client, stats, template_ids)
+            workers.append(asyncio.create_task(_user_loop(user, mix, deadline, think)))
+            if spawn_rate and i < users - 1:
+                await asyncio.sleep(1 / spawn_rate)
+        await asyncio.gather(*workers)
+        stats.finished = time.monotonic()
+    return stats
+
+
+# ---------------- SWEEP ----------------
+def _wait_ready(url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+def _stop(proc):
+    if proc.poll() is None:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def start_stub(port, args):
+    cmd = [
+        sys.executable, "-m", "backend.bench.stub_llm", "--port", str(port),
+        "--latency-ms", str(args.stub_latency_ms), "--jitter-ms", str(args.stub_jitter_ms),
+        "--error-429-rate", str(args.stub_429_rate), "--rpm", str(args.stub_rpm),
+    ]
+    proc = subprocess.Popen(cmd, cwd=ROOT_DIR)
+    _wait_ready(f"http://127.0.0.1:{port}/health")
+    return proc
+
+
+def start_app(port, workers, render_concurrency, stub_port):
+    env = dict(
+        os.environ,
+        GUNICORN_WORKERS=str(workers),
+        RENDER_CONCURRENCY=str(render_concurrency),
+        OPENAI_BASE_URL=f"http://127.0.0.1:{stub_port}/v1",
+        OPENAI_API_KEY="stub-key",
+    )
+    cmd = [
+        sys.executable, "-m", "gunicorn", "-c", GUNICORN_CONF,
+        "-k", "uvicorn.workers.UvicornWorker", "-b", f"127.0.0.1:{port}",
+        "backend.app.main:app",
+    ]
+    proc = subprocess.Popen(cmd, cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL)
+    # /ready waits for cache warm-up so the first measurements aren't cold
+    _wait_ready(f"http://127.0.0.1:{port}/ready")
+    return proc
+
+
+def recommend(results, slo_p95_ms, max_error_rate):
+    """
+    Pick the config with the best throughput that meets the p95 SLO and error
+    budget. Configs within 5% of the best throughput are considered equal and
+    the one with fewer workers, then fewer concurrent PDF jobs, wins (less RAM
+    per box).
+    """
+    ok = [
+        r for r in results
+        if r["summary"]["ALL"]["p95_ms"] <= slo_p95_ms and r["summary"]["ALL"]["error_rate"] <= max_error_rate
+    ]
+    if not ok:
+        return None
+    best_rps = max(r["summary"]["ALL"]["rps"] for r in ok)
+    close = [r for r in ok if r["summary"]["ALL"]["rps"] >= best_rps * 0.95]
+    return min(close, key=lambda r: (r["workers"], r["render_concurrency"] or os.cpu_count() or 2))
+
+
+def sweep(args, mix):
+    results = []
+    stub = start_stub(args.stub_port, args)
+    try:
+        for workers in args.workers:
+            for concurrency in args.render_concurrency:
+                app = start_app(args.port, workers, concurrency, args.stub_port)
+                try:
+                    stats = asyncio.run(run_load(
+                        f"http://127.0.0.1:{args.port}", args.users, args.duration, args.spawn_rate, mix, args.think,
+                    ))
+                finally:
+                    _stop(app)
+                summary = stats.summary()
+                print_summary(summary, f"workers={workers} render_concurrency={concurrency}")
+                results.append({"workers": workers, "render_concurrency": concurrency, "summary": summary})
+    finally:
+        _stop(stub)
+
+    print(f"\n{'workers':>8}{'renders':>8}{'rps':>9}{'p95':>9}{'p99':>9}{'err%':>8}")
+    for r in results:
+        a = r["summary"]["ALL"]
+        print(f"{r['workers']:>8}{r['render_concurrency']:>8}{a['rps']:>9.2f}{a['p95_ms']:>9.1f}{a['p99_ms']:>9.1f}{a['error_rate'] * 100:>8.2f}")
+
+    best = recommend(results, args.slo_p95_ms, args.max_error_rate)
+    if best:
+        print(
+            f"\n✅ Recommended: GUNICORN_WORKERS={best['workers']} RENDER_CONCURRENCY={best['render_concurrency']} "
+            f"({best['summary']['ALL']['rps']} rps, p95 {best['summary']['ALL']['p95_ms']} ms)"
+        )
+    else:
+        print(f"\n⚠️ No configuration met p95 <= {args.slo_p95_ms} ms with error rate <= {args.max_error_rate:.1%}")
+    return {"results": results, "recommended": best}
+
+
+# ---------------- CLI ----------------
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def _mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown task '{name}' (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ResumeXpert load test")
+    parser.add_argument("--target", help="Base URL of a running app (skips --sweep)")
+    parser.add_argument("--sweep", action="store_true", help="Boot stub + gunicorn for each workers x render-concurrency combination")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--spawn-rate", type=float, default=5.0, help="Users started per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load per run")
+    parser.add_argument("--think", type=float, default=1.0, help="Max random think time between tasks (s)")
+    parser.add_argument("--mix", type=_mix, default=None, help="e.g. browse=5,preview=8,generate=2,suggest=1")
+    parser.add_argument("--workers", type=_int_list, default=[1, 2, 4])
+    parser.add_argument("--render-concurrency", type=_int_list, default=[1, 2, 4], help="RENDER_CONCURRENCY values (PDF jobs per worker)")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--stub-latency-ms", type=float, default=600.0)
+    parser.add_argument("--stub-jitter-ms", type=float, default=200.0)
+    parser.add_argument("--stub-429-rate", type=float, default=0.02)
+    parser.add_argument("--stub-rpm", type=int, default=0)
+    parser.add_argument("--slo-p95-ms", type=float, default=2000.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--json", dest="json_out", help="Write raw results to this file")
+    args = parser.parse_args()
+
+    mix = args.mix or DEFAULT_MIX
+    if args.target:
+        stats = asyncio.run(run_load(args.target, args.users, args.duration, args.spawn_rate, mix, args.think))
+        report = {"target": args.target, "summary": stats.summary()}
+        print_summary(report["summary"], args.target)
+    elif args.sweep:
+        report = sweep(args, mix)
+    else:
+        parser.error("pass --target URL or --sweep")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
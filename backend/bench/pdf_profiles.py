@@ -0,0 +1,145 @@
+# backend/bench/pdf_profiles.py
+"""
+PDF output profile benchmark.
+
+Renders the sample resume with every seeded template under each profile in
+pdfgen.PDF_PROFILES (in-process, without the render pool) and reports the PDF
+size, bytes saved against the "default" profile and the median render time
+(layout + write) with its delta.
+
+  python -m backend.bench.pdf_profiles --repeat 5
+  python -m backend.bench.pdf_profiles --photo me.jpg --profiles default,balanced,compact --json out.json
+
+Templates only embed an image when given one, so pass --photo to measure the
+image options. Needs a seeded database (python -m backend.app.init_db).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import select
+
+from backend.app import pdfgen, photos
+from backend.app.db import async_session_maker
+from backend.app.models import Template
+from backend.app.sample_data import SAMPLE_RESUME
+
+BASELINE = "default"
+
+
+async def fetch_templates(ids=None):
+    query = select(Template.id, Template.name, Template.html, Template.css).order_by(Template.id)
+    if ids:
+        query = query.where(Template.id.in_(ids))
+    async with async_session_maker() as session:
+        result = await session.execute(query)
+        return result.all()
+
+
+def bench_template(tpl, data, profiles, repeat):
+    html = pdfgen.render_html_from_template(tpl.html, tpl.css, data)
+    rows = []
+    for profile in profiles:
+        # Untimed pass fills the stylesheet and image caches, like a warm worker
+        pdfgen.generate_pdf_from_html(html, css=tpl.css, profile=profile)
+        totals, layouts, writes = [], [], []
+        for _ in range(repeat):
+            timings = {}
+            t0 = time.perf_counter()
+            pdf = pdfgen.generate_pdf_from_html(html, css=tpl.css, timings=timings, profile=profile)
+            totals.append((time.perf_counter() - t0) * 1000)
+            layouts.append(timings["pdf_layout_ms"])
+            writes.append(timings["pdf_write_ms"])
+        rows.append({
+            "template_id": tpl.id,
+            "template": tpl.name,
+            "profile": profile,
+            "bytes": len(pdf),
+            "ms": round(statistics.median(totals), 2),
+            "layout_ms": round(statistics.median(layouts), 2),
+            "write_ms": round(statistics.median(writes), 2),
+        })
+
+    base = next(r for r in rows if r["profile"] == BASELINE)
+    for r in rows:
+        r["saved_bytes"] = base["bytes"] - r["bytes"]
+        r["saved_pct"] = round(r["saved_bytes"] / base["bytes"] * 100, 1) if base["bytes"] else 0.0
+        r["delta_ms"] = round(r["ms"] - base["ms"], 2)
+    return rows
+
+
+def print_table(rows, title):
+    print(f"\n=== {title} ===")
+    print(f"{'profile':<14}{'bytes':>10}{'saved':>10}{'saved%':>8}{'ms':>9}{'layout':>9}{'write':>9}{'Δms':>9}")
+    for r in rows:
+        print(
+            f"{r['profile']:<14}{r['bytes']:>10}{r['saved_bytes']:>10}{r['saved_pct']:>8.1f}"
+            f"{r['ms']:>9.1f}{r['layout_ms']:>9.1f}{r['write_ms']:>9.1f}{r['delta_ms']:>+9.1f}"
+        )
+
+
+def print_totals(results, profiles):
+    """Per profile across all templates: total bytes and summed median time."""
+    print("\n=== All templates ===")
+    print(f"{'profile':<14}{'bytes':>10}{'saved':>10}{'saved%':>8}{'ms':>9}{'Δms':>9}")
+    base_bytes = sum(r["bytes"] for r in results if r["profile"] == BASELINE)
+    base_ms = sum(r["ms"] for r in results if r["profile"] == BASELINE)
+    for profile in profiles:
+        size = sum(r["bytes"] for r in results if r["profile"] == profile)
+        ms = sum(r["ms"] for r in results if r["profile"] == profile)
+        saved_pct = (base_bytes - size) / base_bytes * 100 if base_bytes else 0.0
+        print(f"{profile:<14}{size:>10}{base_bytes - size:>10}{saved_pct:>8.1f}{ms:>9.1f}{ms - base_ms:>+9.1f}")
+
+
+def _profiles(value):
+    names = [n.strip() for n in value.split(",") if n.strip()]
+    for name in names:
+        if name not in pdfgen.PDF_PROFILES:
+            raise argparse.ArgumentTypeError(f"unknown profile '{name}' (choose from {', '.join(pdfgen.PDF_PROFILES)})")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ResumeXpert PDF output profile benchmark")
+    parser.add_argument("--profiles", type=_profiles, default=list(pdfgen.PDF_PROFILES))
+    parser.add_argument("--templates", type=lambda v: [int(i) for i in v.split(",")], default=None, help="Template ids, e.g. 1,3")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed renders per template and profile")
+    parser.add_argument("--photo", help="Image to embed as the resume photo (templates using photo_url)")
+    parser.add_argument("--json", dest="json_out", help="Write raw results to this file")
+    args = parser.parse_args()
+
+    profiles = args.profiles if BASELINE in args.profiles else [BASELINE, *args.profiles]
+    templates = asyncio.run(fetch_templates(args.templates))
+    if not templates:
+        raise SystemExit("❌ No templates found; seed the database first (python -m backend.app.init_db)")
+
+    with tempfile.TemporaryDirectory() as photo_dir:
+        data = SAMPLE_RESUME
+        if args.photo:
+            with open(args.photo, "rb") as f:
+                manifest = photos.process_photo(f.read(), photo_dir)
+            data = photos.with_photo_url({**SAMPLE_RESUME, "photo": manifest["id"]}, photo_dir, for_pdf=True)
+
+        results = []
+        for tpl in templates:
+            try:
+                rows = bench_template(tpl, data, profiles, args.repeat)
+            except Exception as e:
+                print(f"⚠️ Template {tpl.id} ({tpl.name}) failed:", e)
+                continue
+            print_table(rows, f"{tpl.id} · {tpl.name}")
+            results.extend(rows)
+
+    if results:
+        print_totals(results, profiles)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n📝 Raw results written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# backend/bench/stub_llm.py
+"""
+Local stand-in for the OpenAI /v1/chat/completions endpoint.
+
+Used by the load-test harness so the app can be driven hard without touching
+the real API. Latency, rate limiting (429) and streaming are all configurable:
+
+    python -m backend.bench.stub_llm --port 9100 --latency-ms 800 --jitter-ms 300 \
+        --error-429-rate 0.05 --rpm 600
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:9100/v1 and any
+non-empty OPENAI_API_KEY.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_TEXT = (
+    "Results-driven candidate with hands-on experience delivering data projects "
+    "end to end. Comfortable with Python, SQL and modern ML tooling. "
+    "Communicates clearly and ships reliable work under tight deadlines."
+)
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 600.0       # mean time before the first byte
+    jitter_ms: float = 200.0        # +/- uniform jitter around latency_ms
+    error_429_rate: float = 0.0     # probability of a random 429
+    rpm: int = 0                    # sliding-window requests/minute cap (0 = off)
+    stream_chunk_ms: float = 30.0   # delay between SSE chunks when stream=true
+    retry_after: int = 1            # Retry-After header sent with 429s
+
+
+def create_app(cfg: StubConfig) -> FastAPI:
+    app = FastAPI(title="ResumeXpert LLM stub")
+    window = deque()
+    counters = {"requests": 0, "rate_limited": 0, "streamed": 0}
+
+    def rate_limited() -> bool:
+        if cfg.error_429_rate and random.random() < cfg.error_429_rate:
+            return True
+        if cfg.rpm:
+            now = time.monotonic()
+            while window and now - window[0] > 60:
+                window.popleft()
+            if len(window) >= cfg.rpm:
+                return True
+            window.append(now)
+        return False
+
+    def too_many():
+        counters["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            headers={"Retry-After": str(cfg.retry_after)},
+            content={"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}},
+        )
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        counters["requests"] += 1
+        body = await request.json()
+        if rate_limited():
+            return too_many()
+
+        delay = max(0.0, cfg.latency_ms + random.uniform(-cfg.jitter_ms, cfg.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+        model = body.get("model", "stub")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            counters["streamed"] += 1
+
+            async def events():
+                for word in STUB_TEXT.split(" "):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(cfg.stream_chunk_ms / 1000)
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": STUB_TEXT},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(STUB_TEXT.split()), "total_tokens": len(STUB_TEXT.split())},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return counters
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=StubConfig.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=StubConfig.jitter_ms)
+    parser.add_argument("--error-429-rate", type=float, default=StubConfig.error_429_rate)
+    parser.add_argument("--rpm", type=int, default=StubConfig.rpm)
+    parser.add_argument("--stream-chunk-ms", type=float, default=StubConfig.stream_chunk_ms)
+    parser.add_argument("--retry-after", type=int, default=StubConfig.retry_after)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    cfg = StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_429_rate=args.error_429_rate,
+        rpm=args.rpm,
+        stream_chunk_ms=args.stream_chunk_ms,
+        retry_after=args.retry_after,
+    )
+    uvicorn.run(create_app(cfg), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# backend/tests/test_drafts.py
+import pytest
+
+from backend.app.drafts import PatchError, RenderCache, apply_patch
+
+
+# ---------------- JSON POINTERS ----------------
+def test_pointer_escapes():
+    doc = {"a/b": 1, "m~n": 2, "~1": 3}
+    out = apply_patch(doc, [
+        {"op": "replace", "path": "/a~1b", "value": 10},
+        {"op": "replace", "path": "/m~0n", "value": 20},
+        # "~01" is "~1" literally, not "/"
+        {"op": "replace", "path": "/~01", "value": 30},
+    ])
+    assert out == {"a/b": 10, "m~n": 20, "~1": 30}
+
+
+def test_empty_key_is_not_the_root():
+    assert apply_patch({"": 1}, [{"op": "replace", "path": "/", "value": 2}]) == {"": 2}
+
+
+def test_pointer_must_start_with_slash():
+    with pytest.raises(PatchError):
+        apply_patch({"a": 1}, [{"op": "remove", "path": "a"}])
+
+
+# ---------------- ARRAYS ----------------
+def test_dash_appends():
+    out = apply_patch({"skills": ["a"]}, [{"op": "add", "path": "/skills/-", "value": "b"}])
+    assert out == {"skills": ["a", "b"]}
+
+
+def test_add_inserts_at_index_and_at_end():
+    out = apply_patch({"l": [1, 3]}, [
+        {"op": "add", "path": "/l/1", "value": 2},
+        {"op": "add", "path": "/l/3", "value": 4},
+    ])
+    assert out == {"l": [1, 2, 3, 4]}
+
+
+@pytest.mark.parametrize("path", ["/l/-", "/l/2", "/l/01", "/l/x", "/l/-1"])
+def test_bad_indexes_for_replace_and_remove(path):
+    for op in ({"op": "replace", "path": path, "value": 0}, {"op": "remove", "path": path}):
+        with pytest.raises(PatchError):
+            apply_patch({"l": [1, 2]}, [op])
+
+
+def test_dash_is_not_a_path_segment():
+    with pytest.raises(PatchError):
+        apply_patch({"l": [{"a": 1}]}, [{"op": "add", "path": "/l/-/a", "value": 2}])
+
+
+# ---------------- OPERATIONS ----------------
+def test_add_replaces_existing_member():
+    assert apply_patch({"a": 1}, [{"op": "add", "path": "/a", "value": 2}]) == {"a": 2}
+
+
+def test_replace_and_remove_need_an_existing_target():
+    for op in ({"op": "replace", "path": "/b", "value": 1}, {"op": "remove", "path": "/b"}):
+        with pytest.raises(PatchError):
+            apply_patch({"a": 1}, [op])
+
+
+def test_add_needs_an_existing_parent():
+    with pytest.raises(PatchError):
+        apply_patch({}, [{"op": "add", "path": "/a/b", "value": 1}])
+
+
+def test_move_and_copy():
+    doc = {"a": {"x": 1}, "l": [1, 2, 3]}
+    out = apply_patch(doc, [
+        {"op": "copy", "from": "/a", "path": "/b"},
+        {"op": "move", "from": "/a/x", "path": "/c"},
+        {"op": "move", "from": "/l/0", "path": "/l/-"},
+    ])
+    assert out == {"a": {}, "b": {"x": 1}, "c": 1, "l": [2, 3, 1]}
+
+
+def test_copy_is_independent_of_its_source():
+    out = apply_patch({"a": {"x": 1}}, [
+        {"op": "copy", "from": "/a", "path": "/b"},
+        {"op": "replace", "path": "/b/x", "value": 2},
+    ])
+    assert out == {"a": {"x": 1}, "b": {"x": 2}}
+
+
+def test_move_into_own_child_is_rejected():
+    with pytest.raises(PatchError):
+        apply_patch({"a": {"b": {}}}, [{"op": "move", "from": "/a", "path": "/a/b/c"}])
+
+
+def test_move_to_same_path_and_to_prefixed_sibling():
+    assert apply_patch({"a": 1}, [{"op": "move", "from": "/a", "path": "/a"}]) == {"a": 1}
+    # "/ab" shares a string prefix with "/a" but is not its child
+    assert apply_patch({"a": 1}, [{"op": "move", "from": "/a", "path": "/ab"}]) == {"ab": 1}
+
+
+def test_test_op():
+    doc = {"a": [1, {"b": "c"}]}
+    assert apply_patch(doc, [{"op": "test", "path": "/a/1", "value": {"b": "c"}}]) == doc
+    with pytest.raises(PatchError):
+        apply_patch(doc, [{"op": "test", "path": "/a/0", "value": 2}])
+
+
+# ---------------- DOCUMENT ROOT ----------------
+def test_root_replace_with_an_object():
+    assert apply_patch({"a": 1}, [{"op": "replace", "path": "", "value": {"b": 2}}]) == {"b": 2}
+
+
+@pytest.mark.parametrize("op", [
+    {"op": "replace", "path": "", "value": [1]},
+    {"op": "add", "path": "", "value": "text"},
+    {"op": "remove", "path": ""},
+])
+def test_root_must_stay_an_object(op):
+    with pytest.raises(PatchError):
+        apply_patch({"a": 1}, [op])
+
+
+# ---------------- WHOLE PATCHES ----------------
+def test_failing_op_aborts_patch_and_input_is_untouched():
+    doc = {"a": {"x": 1}}
+    with pytest.raises(PatchError):
+        apply_patch(doc, [
+            {"op": "replace", "path": "/a/x", "value": 2},
+            {"op": "remove", "path": "/missing"},
+        ])
+    assert doc == {"a": {"x": 1}}
+
+
+@pytest.mark.parametrize("ops", [{"op": "add"}, ["add"], [{"op": "add"}], [{"op": "frobnicate", "path": "/a"}]])
+def test_malformed_patches(ops):
+    with pytest.raises(PatchError):
+        apply_patch({"a": 1}, ops)
+
+
+# ---------------- RENDER CACHE ----------------
+def test_render_cache_evicts_least_recently_used():
+    cache = RenderCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
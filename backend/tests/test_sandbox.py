@@ -0,0 +1,135 @@
+# backend/tests/test_sandbox.py
+import pytest
+
+try:
+    from backend.app import pdfgen
+except OSError as e:  # WeasyPrint needs Pango/Cairo at import time
+    pytest.skip(f"WeasyPrint unavailable: {e}", allow_module_level=True)
+
+from backend.app.config import settings
+from backend.app.init_db import templates as SEEDED_TEMPLATES
+from backend.app.pdfgen import RenderError
+from backend.app.sample_data import SAMPLE_RESUME
+
+
+def render(src, data=None, **kwargs):
+    return pdfgen.render_body(pdfgen.get_template(src), data or {}, **kwargs)
+
+
+def assert_refused(code, src, data=None, **kwargs):
+    with pytest.raises(RenderError) as exc:
+        render(src, data, **kwargs)
+    assert exc.value.code == code, exc.value.message
+    return exc.value
+
+
+@pytest.fixture
+def small_budget(monkeypatch):
+    monkeypatch.setattr(settings, "RENDER_MAX_OPS", 1000)
+
+
+# ---------------- LOOPS ----------------
+def test_loop_over_a_long_string_hits_the_op_limit(small_budget):
+    assert_refused("render_op_limit", "{% for c in s %}{% endfor %}", {"s": "a" * 5000})
+
+
+def test_filtered_loop_is_charged_for_skipped_items(small_budget):
+    # Nothing is emitted, but every item is still tested against the condition
+    assert_refused("render_op_limit", "{% for x in items if false %}{{ x }}{% endfor %}", {"items": list(range(5000))})
+
+
+def test_nested_ranges_hit_the_op_limit(small_budget):
+    assert_refused("render_op_limit", "{% for i in range(100) %}{% for j in range(100) %}{% endfor %}{% endfor %}")
+
+
+def test_range_larger_than_the_op_limit_is_forbidden(small_budget):
+    assert_refused("template_forbidden", "{% for i in range(10**9) %}{% endfor %}")
+
+
+def test_recursive_loop_is_a_template_error():
+    src = "{% for x in items recursive %}{{ loop(items) }}{% endfor %}"
+    assert_refused("template_error", src, {"items": [1]})
+
+
+def test_slow_loop_times_out():
+    src = "{% for i in range(100000) %}{{ i }}{% endfor %}"
+    assert_refused("render_timeout", src, timeout_ms=1)
+
+
+# ---------------- STRING GROWTH ----------------
+def test_tilde_doubling_is_forbidden():
+    src = "{% set ns = namespace(s='a') %}{% for i in range(40) %}{% set ns.s = ns.s ~ ns.s %}{% endfor %}"
+    assert_refused("template_forbidden", src)
+
+
+def test_plus_doubling_is_forbidden():
+    src = "{% set ns = namespace(s='a') %}{% for i in range(40) %}{% set ns.s = ns.s + ns.s %}{% endfor %}"
+    assert_refused("template_forbidden", src)
+
+
+@pytest.mark.parametrize("src", [
+    "{{ 'a' * 10**8 }}",
+    "{{ ['a'] * 10**8 }}",
+    "{{ 10 ** 100 }}",
+    "{{ ((10 ** 64) ** 64) ** 64 }}",
+])
+def test_large_repetition_and_power_are_forbidden(src):
+    assert_refused("template_forbidden", src)
+
+
+def test_small_repetition_is_allowed():
+    assert render("{{ '-' * 3 }}") == "---"
+
+
+@pytest.mark.parametrize("src", [
+    "{{ '%0999999999d' % 1 }}",
+    "{{ '%*d' % (999999999, 1) }}",
+    "{{ '%0999999999d' | format(1) }}",
+    "{{ '{:>999999999}'.format('x') }}",
+    "{{ '{:{w}}'.format('x', w=999999999) }}",
+    "{{ 'x'.center(999999999) }}",
+    "{{ 'x'.zfill(999999999) }}",
+    "{{ 'x' | center(999999999) }}",
+])
+def test_format_widths_are_bounded(src):
+    assert_refused("template_forbidden", src)
+
+
+def test_small_format_widths_are_allowed():
+    assert render("{{ '%03d' % 7 }}|{{ '{:>4}'.format('x') }}") == "007|   x"
+
+
+def test_set_block_output_is_bounded():
+    src = "{% set block %}{% for i in range(200) %}0123456789{% endfor %}{% endset %}{{ block | length }}"
+    assert_refused("template_forbidden", src, max_bytes=1000)
+    assert render(src) == "2000"
+
+
+def test_total_output_is_bounded():
+    assert_refused("output_too_large", "{% for i in range(200) %}0123456789{% endfor %}", max_bytes=1000)
+
+
+def test_batch_fill_is_bounded():
+    assert_refused("template_forbidden", "{{ [1] | batch(10**9, 0) | list }}")
+
+
+# ---------------- OTHER ERRORS ----------------
+def test_lipsum_is_not_available():
+    assert_refused("template_error", "{{ lipsum(10**6) }}")
+
+
+def test_unsafe_attribute_is_forbidden():
+    assert_refused("template_forbidden", "{{ ''.__class__.__mro__ }}")
+
+
+def test_runtime_errors_are_template_errors():
+    err = assert_refused("template_error", "{{ 1 / 0 }}")
+    assert "ZeroDivisionError" in err.message
+
+
+# ---------------- SEEDED TEMPLATES ----------------
+@pytest.mark.parametrize("name, html, css", [(n, h, c) for n, _, h, c in SEEDED_TEMPLATES])
+def test_seeded_templates_render(name, html, css):
+    out = pdfgen.render_html_from_template(html, css, SAMPLE_RESUME)
+    assert SAMPLE_RESUME["name"] in out
+    assert SAMPLE_RESUME["skills"][0] in out
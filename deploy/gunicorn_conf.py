@@ -1,4 +1,16 @@
-workers = 2
-threads = 2
+import os
+
+# Overridable so backend/bench/loadtest.py can sweep worker counts.
+# No `threads`: it only applies to gunicorn's gthread worker, and the app
+# runs under uvicorn.workers.UvicornWorker. Per-worker render parallelism
+# is RENDER_CONCURRENCY (backend/app/config.py).
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
 timeout = 120
 preload_app = False
+
+
+def on_starting(server):
+    # Upgrade the schema once, before workers boot and race each other for it
+    from backend.app.schema import migrate
+
+    migrate()
@@ -42,6 +42,7 @@ function hideLoader() {
 // ---------- Global state ----------
 let CURRENT_TEMPLATE = null;
 let CURRENT_DATA = {};
+let PHOTO_ID = null; // content-hash id returned by /api/photos
 
 // ---------- Load templates (index page) ----------
 async function loadTemplates() {
@@ -86,6 +87,8 @@ function buildForm() {
       <input id="title" placeholder="Professional Title" />
       <input id="email" placeholder="Email" required />
       <input id="phone" placeholder="Phone" required />
+      <label for="photoInput">Photo (optional)</label>
+      <input type="file" id="photoInput" accept="image/*" />
       <h3>Summary</h3>
       <textarea id="summary" placeholder="Professional summary"></textarea>
 
@@ -115,6 +118,7 @@ function buildForm() {
         
 
         <button type="button" id="downloadBtn" class="cta secondary">Download PDF</button>
+        <button type="button" id="compareBtn" class="cta secondary">Compare Templates</button>
       </div>
     </form>
   `;
@@ -122,6 +126,8 @@ function buildForm() {
   // ✅ Attach listeners *after* inserting HTML
   document.getElementById("resumeForm").addEventListener("submit", previewResume);
   document.getElementById("downloadBtn").addEventListener("click", generatePDF);
+  document.getElementById("photoInput").addEventListener("change", uploadPhoto);
+  document.getElementById("compareBtn").addEventListener("click", compareTemplates);
 
   console.log("✅ Form & buttons ready");
   document.getElementById("sampleBtn").addEventListener("click", fillSampleData);
@@ -139,6 +145,7 @@ function safe(id) {
 
 function readFormData() {
   return {
+    ...(PHOTO_ID ? { photo: PHOTO_ID } : {}),
     name: safe("name"),
     title: safe("title"),
     email: safe("email"),
@@ -194,6 +201,26 @@ function fillSampleData() {
 
 }
 
+// ---------- Photo Upload ----------
+async function uploadPhoto(e) {
+  const file = e.target.files[0];
+  if (!file) return;
+
+  showLoader("🖼️ Processing your photo...");
+  try {
+    const fd = new FormData();
+    fd.append("photo", file);
+    const res = await api("/api/photos", { method: "POST", body: fd });
+    PHOTO_ID = res.id;
+    previewResume(new Event("submit"));
+  } catch (err) {
+    console.error("Photo upload failed:", err);
+    alert("❌ Photo upload failed: " + err.message);
+  } finally {
+    hideLoader();
+  }
+}
+
 // ---------- AI Generation ----------
 // ---------- AI Generation ----------
 async function generateWithAI() {
@@ -291,6 +318,116 @@ function hideLoader() {
 }
 
 
+// ---------- Drafts (delta autosave) ----------
+// The owner token and the current draft id live in localStorage, so a reload
+// resumes the same draft instead of starting an orphan one
+let DRAFT = null; // { id, version, data } of the last synced draft
+
+function setDraft(draft) {
+  DRAFT = draft;
+  if (draft) localStorage.setItem("draftId", draft.id);
+  else localStorage.removeItem("draftId");
+  return draft;
+}
+
+function draftHeaders(extra = {}) {
+  const token = localStorage.getItem("draftToken");
+  return token ? { ...extra, "X-Draft-Token": token } : extra;
+}
+
+// JSON-patch ops turning `a` into `b`; arrays are replaced whole
+function diffData(a, b, path = "") {
+  const ops = [];
+  const esc = (k) => String(k).replace(/~/g, "~0").replace(/\//g, "~1");
+  const isObj = (v) => v && typeof v === "object" && !Array.isArray(v);
+  Object.keys(a).forEach((k) => {
+    if (!(k in b)) ops.push({ op: "remove", path: `${path}/${esc(k)}` });
+  });
+  Object.keys(b).forEach((k) => {
+    const p = `${path}/${esc(k)}`;
+    if (!(k in a)) ops.push({ op: "add", path: p, value: b[k] });
+    else if (isObj(a[k]) && isObj(b[k])) ops.push(...diffData(a[k], b[k], p));
+    else if (JSON.stringify(a[k]) !== JSON.stringify(b[k])) ops.push({ op: "replace", path: p, value: b[k] });
+  });
+  return ops;
+}
+
+// Save form data as a draft, sending only the delta once one exists.
+// Returns null when drafts are unavailable so callers can send full data.
+async function syncDraft(data, template_id) {
+  try {
+    if (DRAFT) {
+      const ops = diffData(DRAFT.data, data);
+      if (!ops.length) return DRAFT;
+      const res = await fetch(`/api/drafts/${DRAFT.id}`, {
+        method: "PATCH",
+        headers: draftHeaders({ "Content-Type": "application/json" }),
+        body: JSON.stringify({ base_version: DRAFT.version, ops, template_id }),
+      });
+      if (res.ok) {
+        const saved = await res.json();
+        return setDraft({ id: saved.id, version: saved.version, data });
+      }
+      setDraft(null); // stale or missing — fall through and start a fresh draft
+    }
+    const res = await fetch("/api/drafts", {
+      method: "POST",
+      headers: draftHeaders({ "Content-Type": "application/json" }),
+      body: JSON.stringify({ data, template_id }),
+    });
+    if (!res.ok) return null;
+    const saved = await res.json();
+    localStorage.setItem("draftToken", saved.token);
+    return setDraft({ id: saved.id, version: saved.version, data });
+  } catch (err) {
+    console.warn("Draft sync failed, sending full data:", err);
+    return null;
+  }
+}
+
+// Put saved draft data back into the form (inverse of readFormData)
+function fillForm(d) {
+  const set = (id, v) => {
+    const el = document.getElementById(id);
+    if (el && v != null) el.value = v;
+  };
+  ["name", "title", "email", "phone", "summary"].forEach((k) => set(k, d[k]));
+  set("skills", (d.skills || []).join(", "));
+  set("experience", (d.experience || []).join("\n"));
+  const edu = d.education || {};
+  [["class10", "edu_10_"], ["inter", "edu_12_"]].forEach(([key, prefix]) => {
+    const e = edu[key] || {};
+    set(prefix + "school", e.school);
+    set(prefix + "year", e.year);
+    set(prefix + "score", e.score);
+  });
+  const degree = edu.degree || {};
+  set("edu_inst", degree.school);
+  set("edu_year", degree.year);
+  set("edu_score", degree.score);
+  PHOTO_ID = d.photo || null;
+}
+
+// Reload the draft saved before a page reload; true when one was restored
+async function restoreDraft() {
+  const id = localStorage.getItem("draftId");
+  if (!id || !localStorage.getItem("draftToken")) return false;
+  try {
+    const res = await fetch(`/api/drafts/${encodeURIComponent(id)}`, { headers: draftHeaders() });
+    if (!res.ok) {
+      if (res.status === 404) setDraft(null);
+      return false;
+    }
+    const saved = await res.json();
+    fillForm(saved.data || {});
+    setDraft({ id: saved.id, version: saved.version, data: saved.data || {} });
+    return true;
+  } catch (err) {
+    console.warn("Could not restore draft:", err);
+    return false;
+  }
+}
+
 // ---------- Preview ----------
 async function previewResume(e) {
   e.preventDefault();
@@ -300,9 +437,15 @@ async function previewResume(e) {
 
   const fd = new FormData();
   fd.append("template_id", template_id);
-  fd.append("data_json", JSON.stringify(data));
+  const draft = await syncDraft(data, template_id);
+  if (draft) {
+    fd.append("draft_id", draft.id);
+    fd.append("version", draft.version);
+  } else {
+    fd.append("data_json", JSON.stringify(data));
+  }
 
-  const res = await fetch("/preview", { method: "POST", body: fd });
+  const res = await fetch("/preview", { method: "POST", body: fd, headers: draftHeaders() });
   const html = await res.text();
   const frame = document.getElementById("previewFrame");
   const doc = frame.contentDocument || frame.contentWindow.document;
@@ -311,6 +454,81 @@ async function previewResume(e) {
   doc.close();
 }
 
+// ---------- Compare Templates (one request for all) ----------
+async function compareTemplates() {
+  const template_id = new URLSearchParams(window.location.search).get("template_id");
+  const data = readFormData();
+
+  showLoader("🧩 Rendering every template...");
+  try {
+    const draft = await syncDraft(data, template_id);
+    const payload = draft
+      ? { template_ids: "all", draft_id: draft.id, version: draft.version }
+      : { template_ids: "all", formData: data };
+    // The server renders "all" a page at a time; follow next_offset to the end
+    const results = [];
+    let offset = 0;
+    while (offset !== null) {
+      const res = await api("/preview/compare", {
+        method: "POST",
+        headers: draftHeaders({ "Content-Type": "application/json" }),
+        body: JSON.stringify({ ...payload, offset }),
+      });
+      results.push(...res.results);
+      offset = res.next_offset ?? null;
+    }
+    showComparison(results);
+  } catch (err) {
+    console.error("Comparison failed:", err);
+    alert("❌ Could not compare templates: " + err.message);
+  } finally {
+    hideLoader();
+  }
+}
+
+function showComparison(results) {
+  let overlay = document.getElementById("compareOverlay");
+  if (!overlay) {
+    overlay = document.createElement("div");
+    overlay.id = "compareOverlay";
+    overlay.addEventListener("click", (e) => {
+      if (e.target === overlay) overlay.style.display = "none";
+    });
+    document.body.appendChild(overlay);
+  }
+  overlay.innerHTML = `<div class="compare-grid"></div>`;
+  const grid = overlay.querySelector(".compare-grid");
+
+  results.forEach((r) => {
+    const card = document.createElement("div");
+    card.className = "compare-card";
+    card.innerHTML = `<h4></h4>`;
+    card.querySelector("h4").textContent = r.name;
+    if (r.error) {
+      const p = document.createElement("p");
+      p.textContent = "⚠️ " + r.error.message;
+      card.appendChild(p);
+    } else {
+      const frame = document.createElement("iframe");
+      frame.srcdoc = r.html;
+      const btn = document.createElement("button");
+      btn.textContent = "Use this template";
+      btn.addEventListener("click", () => {
+        // Switch template in place so the form keeps its contents
+        const url = new URL(window.location.href);
+        url.searchParams.set("template_id", r.template_id);
+        window.history.replaceState(null, "", url);
+        CURRENT_TEMPLATE = { id: String(r.template_id) };
+        overlay.style.display = "none";
+        previewResume(new Event("submit"));
+      });
+      card.append(frame, btn);
+    }
+    grid.appendChild(card);
+  });
+  overlay.style.display = "flex";
+}
+
 // ---------- Generate PDF (Direct Download) ----------
 async function generatePDF() {
   console.log("📄 Download button clicked");
@@ -321,10 +539,14 @@ async function generatePDF() {
   showLoader("📄 Generating your PDF...");
 
   try {
+    const draft = await syncDraft(data, template_id);
+    const payload = draft
+      ? { template_id, draft_id: draft.id, version: draft.version }
+      : { template_id, formData: data };
     const response = await fetch("/generate", {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ template_id, formData: data }),
+      headers: draftHeaders({ "Content-Type": "application/json" }),
+      body: JSON.stringify(payload),
     });
 
     if (!response.ok) {
@@ -367,5 +589,6 @@ document.addEventListener("DOMContentLoaded", async () => {
     buildForm();
     const id = new URLSearchParams(window.location.search).get("template_id");
     if (id) CURRENT_TEMPLATE = { id };
+    if (await restoreDraft()) previewResume(new Event("submit"));
   }
 });